@@ -1,17 +1,26 @@
+import hashlib
+import re
+from collections.abc import Callable
 from enum import Enum
+from functools import lru_cache, partial
+from typing import Any
 
+from lxml import etree
 from lxml.etree import _Element
-from pptx.oxml import CT_TextCharacterProperties  # type: ignore[attr-defined]
-from pptx.oxml.ns import qn
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import Part, XmlPart
+from pptx.oxml.ns import namespaces, qn
 from pptx.presentation import Presentation as PresentationType
 from pptx.shapes.autoshape import Shape
 from pptx.shapes.base import BaseShape
 from pptx.shapes.graphfrm import GraphicFrame
 from pptx.shapes.group import GroupShape
-from pptx.slide import SlideMasters, Slides
+from pptx.slide import SlideMasters, Slides, _BaseSlide
+from pptx.spec import GRAPHIC_DATA_URI_CHART, GRAPHIC_DATA_URI_TABLE
 from pptx.text.text import TextFrame
 
-from logger import Logger
+from logger import Logger, LogLevel
+from xml_package import XmlPackage
 
 
 class ThemeFont(Enum):
@@ -40,10 +49,111 @@ FONT_ELEMENT_MAPPINGS = [
     (qn("a:ea"), FontScript.EAST_ASIAN),
 ]
 
+FONT_ELEMENT_TAGS = tuple(qname for qname, _ in FONT_ELEMENT_MAPPINGS)
+FONT_ELEMENT_SCRIPTS = dict(FONT_ELEMENT_MAPPINGS)
+# Matches an a:latin or a:ea start tag under any namespace prefix
+FONT_ELEMENT_PATTERN = re.compile(rb"<(?:[\w.-]+:)?(?:latin|ea)[\s/>]")
+
+TEXT_CHARACTER_PROPERTIES_TAGS = (qn("a:defRPr"), qn("a:endParaRPr"), qn("a:rPr"))
+
+SHAPE_ELEMENT_TAGS = (
+    qn("p:sp"),
+    qn("p:grpSp"),
+    qn("p:graphicFrame"),
+    qn("p:cxnSp"),
+    qn("p:pic"),
+    qn("p:contentPart"),
+)
+
+DEF_RPR_TAG = qn("a:defRPr")
+RPR_TAG = qn("a:rPr")
+BR_TAG = qn("a:br")
+END_PARA_RPR_TAG = qn("a:endParaRPr")
+
 PRESERVED_CODE_FONT = "Consolas"
 CODE_FONTS_TO_REPLACE = ("Courier New",)
 
 
+class FontAction(Enum):
+    KEEP = "keep"
+    PRESERVE = "preserve"
+    REPLACE = "replace"
+
+
+FontRule = tuple[FontAction, str | None]
+
+
+class FontRules:
+    """Font rewrite rules compiled into a single lookup table.
+
+    The table maps (theme font, script, current typeface) to an action and
+    target typeface. Typefaces not in the table are replaced with the theme
+    font from `FONT_MAPPINGS`.
+    """
+
+    def __init__(
+        self,
+        preserved_fonts: tuple[str, ...] = (),
+        replacements: tuple[tuple[str, str], ...] = (),
+    ) -> None:
+        self._table: dict[tuple[ThemeFont, FontScript, str | None], FontRule] = {}
+        self._defaults: dict[tuple[ThemeFont, FontScript], FontRule] = {}
+        for font_script, theme_fonts in FONT_MAPPINGS.items():
+            for theme_font, default_font in theme_fonts.items():
+                self._defaults[theme_font, font_script] = (
+                    FontAction.REPLACE,
+                    default_font,
+                )
+                table: dict[str, FontRule] = {default_font: (FontAction.KEEP, None)}
+                for current_font, new_font in replacements:
+                    if current_font != new_font:
+                        table[current_font] = (FontAction.REPLACE, new_font)
+                for current_font in preserved_fonts:
+                    if current_font != default_font:
+                        table[current_font] = (FontAction.PRESERVE, None)
+                for current_font, rule in table.items():
+                    self._table[theme_font, font_script, current_font] = rule
+
+    def lookup(
+        self, theme_font: ThemeFont, font_script: FontScript, current_font: str | None
+    ) -> FontRule:
+        rule = self._table.get((theme_font, font_script, current_font))
+        if rule is None:
+            return self._defaults[theme_font, font_script]
+        return rule
+
+
+@lru_cache
+def compile_font_rules(
+    preserve_code_fonts: bool,
+    preserved_code_fonts: tuple[str, ...] = (),
+    code_font_replacements: tuple[tuple[str, str], ...] = (),
+) -> FontRules:
+    """Build the rules for one run.
+
+    `preserved_code_fonts` are kept and the keys of `code_font_replacements`
+    are replaced with their values; with `preserve_code_fonts`, Consolas is
+    kept too and Courier New replaced with it. Replacement targets are kept
+    as well, so a second run changes nothing. Preserving takes precedence
+    over replacing.
+    """
+    replacements = (
+        *(
+            (font, PRESERVED_CODE_FONT)
+            for font in (CODE_FONTS_TO_REPLACE if preserve_code_fonts else ())
+        ),
+        *code_font_replacements,
+    )
+    return FontRules(
+        (
+            *((PRESERVED_CODE_FONT,) if preserve_code_fonts else ()),
+            *preserved_code_fonts,
+            *(new_font for _, new_font in replacements),
+        ),
+        replacements,
+    )
+
+
 def log_font_action(
     theme_font: ThemeFont,
     font_script: FontScript,
@@ -60,230 +170,782 @@ def log_font_action(
     else:
         message = f"Preserve {theme_font.value} {font_script.value} as {current_font}"
     logger.log(message, element_text)
+    logger.record_action(theme_font.value, font_script.value, current_font, new_font)
 
 
-def replace_font_element(
+def replace_font_element_with_rules(
     element: _Element,
     theme_font: ThemeFont,
     font_script: FontScript,
-    preserve_code_fonts: bool,
+    rules: FontRules,
     logger: Logger,
     element_text: str | None = None,
-) -> None:
-    default_font = FONT_MAPPINGS[font_script][theme_font]
+) -> bool:
+    """Apply the replacement rules to one font element.
+
+    Returns True if the element's typeface was changed.
+    """
+    logger.visit_font_element(element, theme_font, font_script, element_text)
     current_font = element.get("typeface")
-    if preserve_code_fonts and current_font == PRESERVED_CODE_FONT:
-        log_font_action(
-            theme_font, font_script, current_font, None, logger, element_text
-        )
-    elif preserve_code_fonts and current_font in CODE_FONTS_TO_REPLACE:
-        element.set("typeface", PRESERVED_CODE_FONT)
-        log_font_action(
-            theme_font,
-            font_script,
-            current_font,
-            PRESERVED_CODE_FONT,
-            logger,
-            element_text,
-        )
-    elif current_font != default_font:
-        element.set("typeface", default_font)
-        log_font_action(
-            theme_font, font_script, current_font, default_font, logger, element_text
+    action, new_font = rules.lookup(theme_font, font_script, current_font)
+    if action is FontAction.KEEP:
+        logger.count_font_element(
+            theme_font.value, font_script.value, False, current_font
         )
+        return False
+    if new_font:
+        element.set("typeface", new_font)
+    log_font_action(
+        theme_font, font_script, current_font, new_font, logger, element_text
+    )
+    logger.count_font_element(
+        theme_font.value, font_script.value, bool(new_font), current_font or ""
+    )
+    return bool(new_font)
 
 
-def replace_properties_fonts(
-    properties: CT_TextCharacterProperties,
+def replace_properties_fonts_with_rules(
+    properties: _Element,
     theme_font: ThemeFont,
-    preserve_code_fonts: bool,
+    rules: FontRules,
     logger: Logger,
     element_text: str | None = None,
-) -> None:
+) -> int:
+    changes = 0
     for qname, font_script in FONT_ELEMENT_MAPPINGS:
         element = properties.find(qname)
         if element is not None:
-            replace_font_element(
+            changes += replace_font_element_with_rules(
                 element,
                 theme_font,
                 font_script,
-                preserve_code_fonts,
+                rules,
                 logger,
                 element_text,
             )
+    return changes
 
 
-def replace_text_frame_fonts(
-    text_frame: TextFrame,
-    theme_font: ThemeFont,
-    preserve_code_fonts: bool,
-    logger: Logger,
-) -> None:
-    lst_style = text_frame._element.find(qn("a:lstStyle"))
-    if lst_style is not None:
-        for level_ppr in lst_style:
-            def_rpr = level_ppr.find(qn("a:defRPr"))
-            if def_rpr is not None:
-                replace_properties_fonts(
-                    def_rpr, theme_font, preserve_code_fonts, logger
+def partname_of(slide: _BaseSlide) -> str:
+    return slide.part.partname.lstrip("/")
+
+
+def replace_related_chart_fonts(
+    part: Part, rules: FontRules, logger: Logger, r_id: str
+) -> int:
+    chart_part = part.related_part(r_id)
+    if not isinstance(chart_part, XmlPart):
+        return 0
+    return replace_descendant_fonts(chart_part._element, rules, logger)
+
+
+def replace_part_fonts(part: XmlPart, rules: FontRules, logger: Logger) -> int:
+    return replace_shape_tree_fonts(
+        part._element,
+        rules,
+        logger,
+        partial(replace_related_chart_fonts, part, rules, logger),
+    )
+
+
+def process_slides_with_rules(slides: Slides, rules: FontRules, logger: Logger) -> int:
+    changes = 0
+    for i, slide in enumerate(slides):
+        logger.log(f"--- Slide {i + 1} ---")
+        logger.set_location(partname_of(slide), i + 1)
+        changes += replace_part_fonts(slide.part, rules, logger)
+        if slide.has_notes_slide:
+            logger.log(f"--- Notes Slide {i + 1} ---")
+            logger.set_location(partname_of(slide.notes_slide), i + 1)
+            changes += replace_part_fonts(slide.notes_slide.part, rules, logger)
+    return changes
+
+
+def replace_text_styles_fonts_with_rules(
+    text_styles: _Element, rules: FontRules, logger: Logger
+) -> int:
+    changes = 0
+    for text_style in text_styles:
+        if text_style.tag == qn("p:titleStyle"):
+            theme_font = ThemeFont.MAJOR
+        else:
+            theme_font = ThemeFont.MINOR
+        for list_style in text_style:
+            if list_style.tag in TEXT_CHARACTER_PROPERTIES_TAGS:
+                changes += replace_properties_fonts_with_rules(
+                    list_style,
+                    theme_font,
+                    rules,
+                    logger,
                 )
-    for paragraph in text_frame.paragraphs:
-        if (
-            paragraph._element.pPr is not None
-            and paragraph._element.pPr.defRPr is not None
-        ):
-            replace_properties_fonts(
-                paragraph._element.pPr.defRPr,
-                theme_font,
-                preserve_code_fonts,
+            else:
+                def_rpr = list_style.find(qn("a:defRPr"))
+                if def_rpr is not None:
+                    changes += replace_properties_fonts_with_rules(
+                        def_rpr,
+                        theme_font,
+                        rules,
+                        logger,
+                    )
+    return changes
+
+
+def part_fingerprint(root: _Element) -> bytes | None:
+    """Return a digest of the part XML, or None if it must not be shared.
+
+    Parts with charts are never shared, as chart fonts live in other parts.
+    """
+    if root.find(f".//{qn('c:chart')}") is not None:
+        return None
+    return hashlib.sha256(etree.tostring(root)).digest()
+
+
+# Shape ID, element path, theme font, script and element text
+FontVisit = tuple[int | None, str, ThemeFont, FontScript, str | None]
+
+
+class SharedParts:
+    """Font edits made to each distinct slide master and layout of a deck.
+
+    Decks assembled by copying slides from other decks often carry many
+    identical masters and layouts. A part whose XML matches one already
+    processed is not walked again: the font elements visited in the first
+    one are looked up by path and go through `replace_font_element_with_rules`
+    in the same order, so logs, JSON Lines records and stats are the same.
+    """
+
+    def __init__(self, rules: FontRules) -> None:
+        self._rules = rules
+        self._visits: dict[bytes, tuple[str, list[FontVisit]]] = {}
+        self.duplicates: dict[str, int] = {}
+
+    def process(
+        self,
+        root: _Element,
+        kind: str,
+        label: str,
+        logger: Logger,
+        process: Callable[[], int],
+    ) -> int:
+        """Run `process` on the part `root`, or replay it for a duplicate.
+
+        Returns the number of font elements changed.
+        """
+        fingerprint = part_fingerprint(root)
+        if fingerprint is None:
+            return process()
+        tree = root.getroottree()
+        if fingerprint in self._visits:
+            original, visits = self._visits[fingerprint]
+            logger.log(f"Same as {original}")
+            self.duplicates[kind] = self.duplicates.get(kind, 0) + 1
+            changes = 0
+            for shape_id, path, theme_font, font_script, element_text in visits:
+                logger.set_shape_id(shape_id)
+                changes += replace_font_element_with_rules(
+                    tree.find(path), theme_font, font_script, self._rules,
+                    logger, element_text,
+                )
+            return changes
+        collected: list[tuple[Any, ...]] = []
+        logger.collect_font_visits(collected)
+        try:
+            changes = process()
+        finally:
+            logger.collect_font_visits(None)
+        self._visits[fingerprint] = (
+            label,
+            [
+                (shape_id, tree.getelementpath(element), *details)
+                for shape_id, element, *details in collected
+            ],
+        )
+        return changes
+
+    def report(self, logger: Logger) -> None:
+        if self.duplicates:
+            counts = " and ".join(
+                f"{count} duplicate {kind}{'s' if count > 1 else ''}"
+                for kind, count in self.duplicates.items()
+            )
+            logger.log(f"Found {counts}.", level=LogLevel.SUMMARY)
+
+
+def replace_slide_master_fonts(
+    part: XmlPart, rules: FontRules, logger: Logger
+) -> int:
+    changes = 0
+    for text_styles in TEXT_STYLES(part._element):
+        changes += replace_text_styles_fonts_with_rules(text_styles, rules, logger)
+    return changes + replace_part_fonts(part, rules, logger)
+
+
+def process_slide_masters_with_rules(
+    slide_masters: SlideMasters, rules: FontRules, logger: Logger
+) -> int:
+    changes = 0
+    shared_parts = SharedParts(rules)
+    for i, slide_master in enumerate(slide_masters):
+        logger.log(f"--- Slide Master {i + 1} ---")
+        logger.set_location(partname_of(slide_master))
+        master_label = f"Slide Master {i + 1}"
+        changes += shared_parts.process(
+            slide_master.element,
+            "slide master",
+            master_label,
+            logger,
+            partial(replace_slide_master_fonts, slide_master.part, rules, logger),
+        )
+        for j, slide_layout in enumerate(slide_master.slide_layouts):
+            logger.log(f"--- Slide Layout {j + 1} ---")
+            logger.set_location(partname_of(slide_layout))
+            changes += shared_parts.process(
+                slide_layout.element,
+                "slide layout",
+                f"Slide Layout {j + 1} of {master_label}",
                 logger,
+                partial(replace_part_fonts, slide_layout.part, rules, logger),
+            )
+    shared_parts.report(logger)
+    return changes
+
+
+def process_notes_master_with_rules(
+    presentation: PresentationType, rules: FontRules, logger: Logger
+) -> int:
+    if presentation.element.find(qn("p:notesMasterIdLst")) is None:
+        return 0
+    notes_master = presentation.notes_master
+    logger.log("--- Notes Master ---")
+    logger.set_location(partname_of(notes_master))
+    return replace_part_fonts(notes_master.part, rules, logger)
+
+
+def process_presentation_with_rules(
+    presentation: PresentationType, rules: FontRules, logger: Logger
+) -> int:
+    """Apply the replacement rules to every slide, master and notes master.
+
+    Returns the number of font elements changed.
+    """
+    with logger.phase("slides"):
+        changes = process_slides_with_rules(presentation.slides, rules, logger)
+    with logger.phase("slide masters"):
+        changes += process_slide_masters_with_rules(
+            presentation.slide_masters, rules, logger
+        )
+    with logger.phase("notes master"):
+        changes += process_notes_master_with_rules(presentation, rules, logger)
+    return changes
+
+
+def _xpath(path: str) -> etree.XPath:
+    return etree.XPath(path, namespaces=namespaces("a", "c", "p", "r"))
+
+
+LST_STYLE_DEF_RPRS = _xpath("a:lstStyle[1]/*/a:defRPr[1]")
+PARAGRAPHS = _xpath("a:p")
+PARAGRAPH_DEF_RPRS = _xpath("a:pPr[1]/a:defRPr[1]")
+RUN_RPRS = _xpath("a:r/a:rPr[1]")
+RUN_TEXT = _xpath("string(../a:t)")
+# Control characters other than tab and line feed, which python-pptx writes
+# to run text as plain-text escapes such as _x000D_
+CONTROL_CHARACTERS = re.compile(r"[\x00-\x08\x0B-\x1F]")
+BR_RPRS = _xpath("a:br/a:rPr[1]")
+END_PARA_RPRS = _xpath("a:endParaRPr[1]")
+IS_TITLE_SHAPE = _xpath("boolean((.//p:ph)[1][@type='ctrTitle' or @type='title'])")
+SHAPE_ID = _xpath("string(*[1]/p:cNvPr/@id)")
+SHAPE_TXBODIES = _xpath("p:txBody[1]")
+GRAPHIC_DATA_URI = _xpath("string(a:graphic/a:graphicData/@uri)")
+TABLE = _xpath("a:graphic/a:graphicData/a:tbl[1]")
+CELL_TXBODY = "a:tr/a:tc/a:txBody[1]"
+# Every cell's text body and paragraph, as markers, with the elements that
+# `replace_txbody_fonts` reaches in it (line breaks in place of their run
+# properties), in document order.
+TABLE_TEXT_ELEMENTS = _xpath(
+    " | ".join(
+        CELL_TXBODY + step
+        for step in (
+            "",
+            "/a:lstStyle[1]/*/a:defRPr[1]",
+            "/a:p",
+            "/a:p/a:pPr[1]/a:defRPr[1]",
+            "/a:p/a:r/a:rPr[1]",
+            "/a:p/a:br[a:rPr]",
+            "/a:p/a:endParaRPr[1]",
+        )
+    )
+)
+CHART_RID = _xpath("string(a:graphic/a:graphicData/c:chart/@r:id)")
+SHAPE_TREES = _xpath("p:cSld/p:spTree")
+TEXT_STYLES = _xpath("p:txStyles[1]")
+SLIDE_RIDS = _xpath("p:sldIdLst/p:sldId/@r:id")
+SLIDE_MASTER_RIDS = _xpath("p:sldMasterIdLst/p:sldMasterId/@r:id")
+SLIDE_LAYOUT_RIDS = _xpath("p:sldLayoutIdLst/p:sldLayoutId/@r:id")
+HAS_NOTES_MASTER = _xpath("boolean(p:notesMasterIdLst)")
+
+
+def _escape_control_character(match: re.Match[str]) -> str:
+    return f"_x{ord(match.group()):04X}_"
+
+
+def run_text(rpr: _Element) -> str:
+    """Return the text of the run `rpr` belongs to, as shown in the log.
+
+    Surrounding whitespace is stripped, and control characters are escaped
+    the way python-pptx escapes them, so that a carriage return in the text
+    never splits a log line.
+    """
+    return CONTROL_CHARACTERS.sub(_escape_control_character, RUN_TEXT(rpr).strip())
+
+
+def replace_txbody_fonts(
+    txbody: _Element,
+    theme_font: ThemeFont,
+    rules: FontRules,
+    logger: Logger,
+) -> int:
+    changes = 0
+    for def_rpr in LST_STYLE_DEF_RPRS(txbody):
+        changes += replace_properties_fonts_with_rules(
+            def_rpr, theme_font, rules, logger
+        )
+    for paragraph in PARAGRAPHS(txbody):
+        for def_rpr in PARAGRAPH_DEF_RPRS(paragraph):
+            changes += replace_properties_fonts_with_rules(
+                def_rpr, theme_font, rules, logger
             )
-        for run in paragraph.runs:
-            run_text = run.text.strip()
-            replace_properties_fonts(
-                run.font._element,
+        for rpr in RUN_RPRS(paragraph):
+            changes += replace_properties_fonts_with_rules(
+                rpr,
                 theme_font,
-                preserve_code_fonts,
+                rules,
                 logger,
-                run_text,
+                run_text(rpr),
             )
-        for br in paragraph._element.findall(qn("a:br")):
-            br_rpr = br.find(qn("a:rPr"))
-            if br_rpr is not None:
-                replace_properties_fonts(
-                    br_rpr, theme_font, preserve_code_fonts, logger
-                )
-        if paragraph._element.endParaRPr is not None:
-            replace_properties_fonts(
-                paragraph._element.endParaRPr,
-                theme_font,
-                preserve_code_fonts,
+        for br_rpr in BR_RPRS(paragraph):
+            changes += replace_properties_fonts_with_rules(
+                br_rpr, theme_font, rules, logger
+            )
+        for end_para_rpr in END_PARA_RPRS(paragraph):
+            changes += replace_properties_fonts_with_rules(
+                end_para_rpr, theme_font, rules, logger
+            )
+    return changes
+
+
+def replace_line_break_fonts(
+    line_breaks: list[_Element], rules: FontRules, logger: Logger
+) -> int:
+    changes = 0
+    for line_break in line_breaks:
+        changes += replace_properties_fonts_with_rules(
+            line_break.find(RPR_TAG), ThemeFont.MINOR, rules, logger
+        )
+    line_breaks.clear()
+    return changes
+
+
+def replace_tbl_fonts(table: _Element, rules: FontRules, logger: Logger) -> int:
+    """Apply the replacement rules to the text of every cell of `table`.
+
+    The same as `replace_txbody_fonts` on each cell, with one XPath pass over
+    the table instead of several per paragraph. Line breaks are held back to
+    the end of their paragraph, so the log order is unchanged.
+    """
+    changes = 0
+    line_breaks: list[_Element] = []
+    for element in TABLE_TEXT_ELEMENTS(table):
+        tag = element.tag
+        if tag == BR_TAG:
+            line_breaks.append(element)
+            continue
+        if tag == RPR_TAG:
+            changes += replace_properties_fonts_with_rules(
+                element, ThemeFont.MINOR, rules, logger, run_text(element)
+            )
+            continue
+        if tag != DEF_RPR_TAG:
+            changes += replace_line_break_fonts(line_breaks, rules, logger)
+            if tag != END_PARA_RPR_TAG:
+                continue
+        changes += replace_properties_fonts_with_rules(
+            element, ThemeFont.MINOR, rules, logger
+        )
+    return changes + replace_line_break_fonts(line_breaks, rules, logger)
+
+
+def replace_descendant_fonts(
+    element: _Element, rules: FontRules, logger: Logger
+) -> int:
+    """Apply the replacement rules to the font elements below `element`.
+
+    The subtree is walked once; latin elements are still handled before
+    east asian ones, so the log order doesn't depend on the document order.
+    """
+    font_elements: dict[FontScript, list[_Element]] = {
+        font_script: [] for _, font_script in FONT_ELEMENT_MAPPINGS
+    }
+    for font_element in element.iterdescendants(*FONT_ELEMENT_TAGS):
+        font_elements[FONT_ELEMENT_SCRIPTS[font_element.tag]].append(font_element)
+    changes = 0
+    for font_script, elements in font_elements.items():
+        for font_element in elements:
+            changes += replace_font_element_with_rules(
+                font_element,
+                ThemeFont.MINOR,
+                font_script,
+                rules,
                 logger,
             )
+    return changes
 
 
-def replace_shape_text_fonts(
-    shape: Shape, preserve_code_fonts: bool, logger: Logger
+ChartFonts = Callable[[str], int]
+
+
+def replace_sp_fonts(
+    shape: _Element, rules: FontRules, logger: Logger, chart_fonts: ChartFonts
+) -> int:
+    theme_font = ThemeFont.MAJOR if IS_TITLE_SHAPE(shape) else ThemeFont.MINOR
+    changes = 0
+    for txbody in SHAPE_TXBODIES(shape):
+        changes += replace_txbody_fonts(txbody, theme_font, rules, logger)
+    return changes
+
+
+def replace_graphic_frame_fonts(
+    shape: _Element, rules: FontRules, logger: Logger, chart_fonts: ChartFonts
+) -> int:
+    uri = GRAPHIC_DATA_URI(shape)
+    if uri == GRAPHIC_DATA_URI_TABLE:
+        return sum(
+            replace_tbl_fonts(table, rules, logger) for table in TABLE(shape)
+        )
+    if uri == GRAPHIC_DATA_URI_CHART:
+        return chart_fonts(CHART_RID(shape))
+    return replace_descendant_fonts(shape, rules, logger)
+
+
+# Shape element tag -> handler; group shapes are expanded by the traversal
+# and the remaining shape kinds (pictures, content parts) carry no text.
+SHAPE_HANDLERS: dict[str, Callable[[_Element, FontRules, Logger, ChartFonts], int]] = {
+    qn("p:sp"): replace_sp_fonts,
+    qn("p:cxnSp"): replace_sp_fonts,
+    qn("p:graphicFrame"): replace_graphic_frame_fonts,
+}
+GROUP_SHAPE_TAG = qn("p:grpSp")
+
+
+def replace_shapes_fonts(
+    shapes: list[_Element], rules: FontRules, logger: Logger, chart_fonts: ChartFonts
+) -> int:
+    """Apply the replacement rules to `shapes` and the shapes in their groups.
+
+    Shapes are visited in document order with an explicit stack, so nested
+    groups cost neither recursion nor shape proxies. `chart_fonts` handles
+    the chart with the given relationship ID and returns the number of
+    changes to count for this part.
+    """
+    changes = 0
+    stack = shapes[::-1]
+    while stack:
+        shape = stack.pop()
+        shape_id = SHAPE_ID(shape)
+        logger.set_shape_id(int(shape_id) if shape_id.isdigit() else None)
+        if shape.tag == GROUP_SHAPE_TAG:
+            stack.extend(shape.iterchildren(*SHAPE_ELEMENT_TAGS, reversed=True))
+            continue
+        handler = SHAPE_HANDLERS.get(shape.tag)
+        if handler is not None:
+            changes += handler(shape, rules, logger, chart_fonts)
+    return changes
+
+
+def replace_shape_tree_fonts(
+    root: _Element, rules: FontRules, logger: Logger, chart_fonts: ChartFonts
+) -> int:
+    """Apply the replacement rules to every shape of a slide-like part."""
+    changes = 0
+    for sp_tree in SHAPE_TREES(root):
+        changes += replace_shapes_fonts(
+            list(sp_tree.iterchildren(*SHAPE_ELEMENT_TAGS)),
+            rules,
+            logger,
+            chart_fonts,
+        )
+    return changes
+
+
+def replace_package_chart_fonts(
+    package: XmlPackage,
+    partname: str,
+    rules: FontRules,
+    logger: Logger,
+    r_id: str,
+) -> int:
+    """Apply the replacement rules to a chart of `partname`.
+
+    Returns 0: a changed chart is a separate part, so it is marked dirty
+    instead of being counted as a change to `partname`.
+    """
+    chart_partname = package.target_partname(partname, r_id)
+    chart = package.root_matching(chart_partname, FONT_ELEMENT_PATTERN)
+    if chart is not None:
+        if replace_descendant_fonts(chart, rules, logger):
+            package.mark_dirty(chart_partname)
+        package.release(chart_partname)
+    return 0
+
+
+def process_part_shapes(
+    package: XmlPackage, partname: str, rules: FontRules, logger: Logger
+) -> int:
+    return replace_shape_tree_fonts(
+        package.root(partname),
+        rules,
+        logger,
+        partial(replace_package_chart_fonts, package, partname, rules, logger),
+    )
+
+
+def process_package_slides(
+    package: XmlPackage, rules: FontRules, logger: Logger
 ) -> None:
-    placeholder = shape.element.find(f".//{qn('p:ph')}")
-    if placeholder is not None and placeholder.get("type") in ["ctrTitle", "title"]:
-        theme_font = ThemeFont.MAJOR
-    else:
-        theme_font = ThemeFont.MINOR
-    replace_text_frame_fonts(
-        shape.text_frame, theme_font, preserve_code_fonts, logger
+    presentation_partname = package.main_partname
+    presentation = package.root(presentation_partname)
+    for i, r_id in enumerate(SLIDE_RIDS(presentation)):
+        slide_partname = package.target_partname(presentation_partname, r_id)
+        logger.log(f"--- Slide {i + 1} ---")
+        logger.set_location(slide_partname, i + 1)
+        if process_part_shapes(package, slide_partname, rules, logger):
+            package.mark_dirty(slide_partname)
+        package.release(slide_partname)
+        if package.has_related(slide_partname, RT.NOTES_SLIDE):
+            logger.log(f"--- Notes Slide {i + 1} ---")
+            notes_partname = package.related_partname(slide_partname, RT.NOTES_SLIDE)
+            logger.set_location(notes_partname, i + 1)
+            if process_part_shapes(
+                package, notes_partname, rules, logger
+            ):
+                package.mark_dirty(notes_partname)
+            package.release(notes_partname)
+
+
+def replace_master_part_fonts(
+    package: XmlPackage, partname: str, rules: FontRules, logger: Logger
+) -> int:
+    changes = 0
+    for text_styles in TEXT_STYLES(package.root(partname)):
+        changes += replace_text_styles_fonts_with_rules(text_styles, rules, logger)
+    return changes + process_part_shapes(package, partname, rules, logger)
+
+
+def process_package_slide_masters(
+    package: XmlPackage, rules: FontRules, logger: Logger
+) -> None:
+    presentation_partname = package.main_partname
+    presentation = package.root(presentation_partname)
+    shared_parts = SharedParts(rules)
+    for i, r_id in enumerate(SLIDE_MASTER_RIDS(presentation)):
+        master_partname = package.target_partname(presentation_partname, r_id)
+        slide_master = package.root(master_partname)
+        logger.log(f"--- Slide Master {i + 1} ---")
+        logger.set_location(master_partname)
+        master_label = f"Slide Master {i + 1}"
+        if shared_parts.process(
+            slide_master,
+            "slide master",
+            master_label,
+            logger,
+            partial(
+                replace_master_part_fonts, package, master_partname, rules, logger
+            ),
+        ):
+            package.mark_dirty(master_partname)
+        for j, layout_r_id in enumerate(SLIDE_LAYOUT_RIDS(slide_master)):
+            logger.log(f"--- Slide Layout {j + 1} ---")
+            layout_partname = package.target_partname(master_partname, layout_r_id)
+            logger.set_location(layout_partname)
+            if shared_parts.process(
+                package.root(layout_partname),
+                "slide layout",
+                f"Slide Layout {j + 1} of {master_label}",
+                logger,
+                partial(
+                    process_part_shapes, package, layout_partname, rules, logger
+                ),
+            ):
+                package.mark_dirty(layout_partname)
+            package.release(layout_partname)
+        package.release(master_partname)
+    shared_parts.report(logger)
+
+
+def process_package_notes_master(
+    package: XmlPackage, rules: FontRules, logger: Logger
+) -> None:
+    presentation_partname = package.main_partname
+    if not HAS_NOTES_MASTER(package.root(presentation_partname)):
+        return
+    logger.log("--- Notes Master ---")
+    notes_master_partname = package.related_partname(
+        presentation_partname, RT.NOTES_MASTER
+    )
+    logger.set_location(notes_master_partname)
+    if process_part_shapes(
+        package, notes_master_partname, rules, logger
+    ):
+        package.mark_dirty(notes_master_partname)
+    package.release(notes_master_partname)
+
+
+def process_package_with_rules(
+    package: XmlPackage, rules: FontRules, logger: Logger
+) -> None:
+    """Apply the same rules as `process_presentation_with_rules` to the part XML."""
+    with logger.phase("slides"):
+        process_package_slides(package, rules, logger)
+    with logger.phase("slide masters"):
+        process_package_slide_masters(package, rules, logger)
+    with logger.phase("notes master"):
+        process_package_notes_master(package, rules, logger)
+
+
+# The functions below take the --code flag instead of compiled rules, as they
+# did before rules were compiled. They are kept for library callers.
+
+
+def replace_font_element(
+    element: _Element,
+    theme_font: ThemeFont,
+    font_script: FontScript,
+    preserve_code_fonts: bool,
+    logger: Logger,
+    element_text: str | None = None,
+) -> bool:
+    return replace_font_element_with_rules(
+        element,
+        theme_font,
+        font_script,
+        compile_font_rules(preserve_code_fonts),
+        logger,
+        element_text,
+    )
+
+
+def replace_properties_fonts(
+    properties: _Element,
+    theme_font: ThemeFont,
+    preserve_code_fonts: bool,
+    logger: Logger,
+    element_text: str | None = None,
+) -> int:
+    return replace_properties_fonts_with_rules(
+        properties,
+        theme_font,
+        compile_font_rules(preserve_code_fonts),
+        logger,
+        element_text,
+    )
+
+
+def replace_text_frame_fonts(
+    text_frame: TextFrame,
+    theme_font: ThemeFont,
+    preserve_code_fonts: bool,
+    logger: Logger,
+) -> int:
+    return replace_txbody_fonts(
+        text_frame._txBody, theme_font, compile_font_rules(preserve_code_fonts), logger
     )
 
 
+def replace_shape_text_fonts(
+    shape: Shape, preserve_code_fonts: bool, logger: Logger
+) -> int:
+    return replace_shape_fonts(shape, preserve_code_fonts, logger)
+
+
 def replace_table_fonts(
     shape: GraphicFrame, preserve_code_fonts: bool, logger: Logger
-) -> None:
-    for row in shape.table.rows:
-        for cell in row.cells:
-            replace_text_frame_fonts(
-                cell.text_frame, ThemeFont.MINOR, preserve_code_fonts, logger
-            )
+) -> int:
+    rules = compile_font_rules(preserve_code_fonts)
+    return sum(
+        replace_tbl_fonts(table, rules, logger) for table in TABLE(shape.element)
+    )
 
 
 def replace_graphicframe_fonts(
     shape: GraphicFrame, preserve_code_fonts: bool, logger: Logger
-) -> None:
-    target_element = shape.chart.element if shape.has_chart else shape.element
-    for qname, font_script in FONT_ELEMENT_MAPPINGS:
-        for element in target_element.findall(f".//{qname}"):
-            replace_font_element(
-                element, ThemeFont.MINOR, font_script, preserve_code_fonts, logger
-            )
+) -> int:
+    return replace_shape_fonts(shape, preserve_code_fonts, logger)
 
 
 def replace_group_fonts(
     shape: GroupShape, preserve_code_fonts: bool, logger: Logger
-) -> None:
-    for item in shape.shapes:
-        replace_shape_fonts(item, preserve_code_fonts, logger)
+) -> int:
+    return replace_shape_fonts(shape, preserve_code_fonts, logger)
 
 
 def replace_shape_fonts(
     shape: BaseShape, preserve_code_fonts: bool, logger: Logger
-) -> None:
-    if isinstance(shape, Shape):
-        replace_shape_text_fonts(shape, preserve_code_fonts, logger)
-    elif isinstance(shape, GraphicFrame) and shape.has_table:
-        replace_table_fonts(shape, preserve_code_fonts, logger)
-    elif isinstance(shape, GraphicFrame):
-        replace_graphicframe_fonts(shape, preserve_code_fonts, logger)
-    elif isinstance(shape, GroupShape):
-        replace_group_fonts(shape, preserve_code_fonts, logger)
+) -> int:
+    rules = compile_font_rules(preserve_code_fonts)
+    return replace_shapes_fonts(
+        [shape.element],
+        rules,
+        logger,
+        partial(replace_related_chart_fonts, shape.part, rules, logger),
+    )
 
 
-def process_slides(slides: Slides, preserve_code_fonts: bool, logger: Logger) -> None:
-    for i, slide in enumerate(slides):
-        logger.log(f"--- Slide {i + 1} ---")
-        for shape in slide.shapes:
-            replace_shape_fonts(shape, preserve_code_fonts, logger)
-        if slide.has_notes_slide:
-            logger.log(f"--- Notes Slide {i + 1} ---")
-            for shape in slide.notes_slide.shapes:
-                replace_shape_fonts(shape, preserve_code_fonts, logger)
+def process_slides(slides: Slides, preserve_code_fonts: bool, logger: Logger) -> int:
+    return process_slides_with_rules(
+        slides, compile_font_rules(preserve_code_fonts), logger
+    )
 
 
 def replace_text_styles_fonts(
     text_styles: _Element, preserve_code_fonts: bool, logger: Logger
-) -> None:
-    for text_style in text_styles:
-        if text_style.tag == qn("p:titleStyle"):
-            theme_font = ThemeFont.MAJOR
-        else:
-            theme_font = ThemeFont.MINOR
-        for list_style in text_style:
-            if isinstance(list_style, CT_TextCharacterProperties):
-                replace_properties_fonts(
-                    list_style,
-                    theme_font,
-                    preserve_code_fonts,
-                    logger,
-                )
-            else:
-                def_rpr = list_style.find(qn("a:defRPr"))
-                if def_rpr is not None:
-                    replace_properties_fonts(
-                        def_rpr,
-                        theme_font,
-                        preserve_code_fonts,
-                        logger,
-                    )
+) -> int:
+    return replace_text_styles_fonts_with_rules(
+        text_styles, compile_font_rules(preserve_code_fonts), logger
+    )
 
 
 def process_slide_masters(
     slide_masters: SlideMasters, preserve_code_fonts: bool, logger: Logger
-) -> None:
-    for i, slide_master in enumerate(slide_masters):
-        logger.log(f"--- Slide Master {i + 1} ---")
-        text_styles = slide_master.element.find(qn("p:txStyles"))
-        if text_styles is not None:
-            replace_text_styles_fonts(text_styles, preserve_code_fonts, logger)
-        for shape in slide_master.shapes:
-            replace_shape_fonts(shape, preserve_code_fonts, logger)
-        for j, slide_layout in enumerate(slide_master.slide_layouts):
-            logger.log(f"--- Slide Layout {j + 1} ---")
-            for shape in slide_layout.shapes:
-                replace_shape_fonts(shape, preserve_code_fonts, logger)
+) -> int:
+    return process_slide_masters_with_rules(
+        slide_masters, compile_font_rules(preserve_code_fonts), logger
+    )
 
 
 def process_notes_master(
     presentation: PresentationType, preserve_code_fonts: bool, logger: Logger
-) -> None:
-    if presentation.element.find(qn("p:notesMasterIdLst")) is None:
-        return
-    notes_master = presentation.notes_master
-    logger.log("--- Notes Master ---")
-    for shape in notes_master.shapes:
-        replace_shape_fonts(shape, preserve_code_fonts, logger)
+) -> int:
+    return process_notes_master_with_rules(
+        presentation, compile_font_rules(preserve_code_fonts), logger
+    )
 
 
 def process_presentation(
     presentation: PresentationType, preserve_code_fonts: bool, logger: Logger
+) -> int:
+    """Apply the default rules, or those of --code, to the whole presentation.
+
+    Returns the number of font elements changed.
+    """
+    return process_presentation_with_rules(
+        presentation, compile_font_rules(preserve_code_fonts), logger
+    )
+
+
+def process_package(
+    package: XmlPackage, preserve_code_fonts: bool, logger: Logger
 ) -> None:
-    process_slides(presentation.slides, preserve_code_fonts, logger)
-    process_slide_masters(presentation.slide_masters, preserve_code_fonts, logger)
-    process_notes_master(presentation, preserve_code_fonts, logger)
+    """Apply the same rules as `process_presentation` to the part XML."""
+    process_package_with_rules(
+        package, compile_font_rules(preserve_code_fonts), logger
+    )
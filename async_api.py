@@ -0,0 +1,219 @@
+import asyncio
+import io
+import os
+from concurrent.futures import Executor
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from backup import BackupMethod, requires_atomic_save
+from font_policy import FontPolicy
+from logger import Logger, LogLevel
+from replace_fonts import (
+    Engine,
+    backup_pptx_file,
+    process_pptx_stream,
+    save_pptx_file,
+)
+from xml_package import copy_into_place, move_into_place, sibling_temp_file
+
+
+def rewrite_pptx_file(
+    pptx_path: Path,
+    preserve_code_fonts: bool,
+    font_policy: FontPolicy | None = None,
+    engine: Engine = Engine.PPTX,
+    file_level: LogLevel = LogLevel.DETAIL,
+    low_memory: bool = False,
+    dry_run: bool = False,
+) -> tuple[bool, Path | None, str]:
+    """Replace the fonts of a deck, writing the result to a temporary file.
+
+    Returns (modified, temporary file, log text). The temporary file sits
+    next to `pptx_path`, is flushed to disk, and is None if nothing changed
+    or `dry_run` is set; the caller moves it into place or removes it. The
+    deck itself never crosses a process boundary, so this can run in a
+    process pool, and `low_memory` takes effect.
+    """
+    log = io.StringIO()
+    fd, tmp_name = sibling_temp_file(pptx_path)
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as destination, open(pptx_path, "rb") as source:
+            modified = process_pptx_stream(
+                source, destination, preserve_code_fonts, log, font_policy,
+                engine, file_level, low_memory, str(pptx_path), dry_run,
+            )
+            destination.flush()
+            os.fsync(destination.fileno())
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if not modified or dry_run:
+        tmp_path.unlink()
+        return modified, None, log.getvalue()
+    return modified, tmp_path, log.getvalue()
+
+
+def _move_rewritten(tmp_path: Path | None, pptx_path: Path, atomic: bool) -> None:
+    if tmp_path is None:
+        return
+    if atomic:
+        move_into_place(tmp_path, pptx_path)
+    else:
+        copy_into_place(tmp_path, pptx_path)
+
+
+def save_rewritten_pptx(
+    pptx_path: Path,
+    modified: bool,
+    tmp_path: Path | None,
+    log_text: str,
+    dry_run: bool = False,
+    file_level: LogLevel = LogLevel.DETAIL,
+    backup_method: BackupMethod = BackupMethod.COPY,
+    backup_dir: Path | None = None,
+    atomic_save: bool = False,
+) -> None:
+    """Back up a deck and move its rewritten copy into place, if it changed.
+
+    The log text is appended to the deck's log. The temporary file is
+    removed if saving fails. See `process_pptx_file` for `atomic_save`.
+    """
+    atomic_save = atomic_save or requires_atomic_save(backup_method)
+    try:
+        with (
+            open(pptx_path.with_suffix(".log"), "a") as log_file,
+            Logger(log_file, LogLevel.QUIET, file_level) as logger,
+        ):
+            log_file.write(log_text)
+            save_pptx_file(
+                pptx_path, modified,
+                partial(_move_rewritten, tmp_path, pptx_path, atomic_save),
+                partial(backup_pptx_file, pptx_path, logger, backup_method, backup_dir),
+                dry_run, True, logger,
+            )
+    finally:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+def _discard_rewrite(future: "asyncio.Future[tuple[bool, Path | None, str]]") -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    _, tmp_path, _ = future.result()
+    if tmp_path is not None:
+        tmp_path.unlink(missing_ok=True)
+
+
+class AsyncFontReplacer:
+    """Font replacement for asyncio applications.
+
+    Each file is read and rewritten to a temporary file beside it on
+    `executor` (the event loop's default executor if None; pass a
+    `ProcessPoolExecutor` to keep CPU-bound work off the interpreter running
+    the loop); only paths cross the process boundary. Backing up and moving
+    the new file into place run in a thread. At most `max_concurrency` files
+    are processed at a time.
+
+    Like `--skip-unchanged`, a file is backed up and saved only if its
+    fonts were changed. `timeout` (seconds, None for no limit) bounds
+    rewriting one file. On timeout or cancellation before saving starts,
+    the file is left untouched; a rewrite already running in the executor
+    is left to finish, still holding its place towards `max_concurrency`,
+    and its result is discarded. Once saving has started, it completes even
+    if the caller is cancelled. `atomic_save` is as for `process_pptx_file`.
+    """
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        max_concurrency: int = 1,
+        timeout: float | None = None,
+        backup_method: BackupMethod = BackupMethod.COPY,
+        backup_dir: Path | None = None,
+        atomic_save: bool = False,
+    ) -> None:
+        if max_concurrency < 1:
+            msg = "max_concurrency must be at least 1"
+            raise ValueError(msg)
+        self._executor = executor
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._timeout = timeout
+        self._backup_method = backup_method
+        self._backup_dir = backup_dir
+        self._atomic_save = atomic_save
+
+    def _release(self, future: "asyncio.Future[Any]") -> None:
+        self._semaphore.release()
+
+    def _hold_until_done(self, future: "asyncio.Future[Any]") -> None:
+        """Keep the concurrency slot taken until `future` is done."""
+        future.add_done_callback(self._release)
+
+    async def process_pptx(
+        self,
+        pptx_path: Path,
+        preserve_code_fonts: bool,
+        font_policy: FontPolicy | None = None,
+        engine: Engine = Engine.PPTX,
+        dry_run: bool = False,
+        file_level: LogLevel = LogLevel.DETAIL,
+        low_memory: bool = False,
+    ) -> bool:
+        """Replace the fonts of one file and log what was done next to it.
+
+        Returns True if any font (or theme font) was changed. Raises
+        `asyncio.TimeoutError` if the timeout expires.
+        """
+        rewrite = partial(
+            rewrite_pptx_file,
+            pptx_path,
+            preserve_code_fonts,
+            font_policy=font_policy,
+            engine=engine,
+            file_level=file_level,
+            low_memory=low_memory,
+            dry_run=dry_run,
+        )
+        loop = asyncio.get_running_loop()
+        await self._semaphore.acquire()
+        try:
+            rewriting = loop.run_in_executor(self._executor, rewrite)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        try:
+            modified, tmp_path, log_text = await asyncio.wait_for(
+                asyncio.shield(rewriting), self._timeout
+            )
+        except BaseException:
+            rewriting.add_done_callback(_discard_rewrite)
+            self._hold_until_done(rewriting)
+            raise
+        saving = asyncio.ensure_future(
+            asyncio.to_thread(
+                save_rewritten_pptx, pptx_path, modified, tmp_path, log_text,
+                dry_run, file_level, self._backup_method, self._backup_dir,
+                self._atomic_save,
+            )
+        )
+        self._hold_until_done(saving)
+        await asyncio.shield(saving)
+        return modified
+
+
+async def process_pptx(
+    pptx_path: Path,
+    preserve_code_fonts: bool,
+    font_policy: FontPolicy | None = None,
+    engine: Engine = Engine.PPTX,
+    dry_run: bool = False,
+    timeout: float | None = None,
+    executor: Executor | None = None,
+) -> bool:
+    """Replace the fonts of one file with a one-off `AsyncFontReplacer`."""
+    replacer = AsyncFontReplacer(executor, timeout=timeout)
+    return await replacer.process_pptx(
+        pptx_path, preserve_code_fonts, font_policy, engine, dry_run
+    )
@@ -0,0 +1,134 @@
+import itertools
+import json
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from enum import Enum
+from pathlib import Path
+
+# Linux ioctl that makes one file share another's extents (copy-on-write)
+FICLONE = 0x40049409
+BACKUP_INDEX_NAME = "index.jsonl"
+
+
+class BackupMethod(Enum):
+    COPY = "copy"
+    REFLINK = "reflink"
+    LINK = "link"
+    NONE = "none"
+
+
+def requires_atomic_save(method: BackupMethod) -> bool:
+    """Return whether a file backed up with `method` must be saved atomically.
+
+    A LINK backup shares the original's inode, so the original must be
+    replaced by a new file rather than written in place; with no backup,
+    an interrupted save must not be able to truncate the only copy.
+    """
+    return method in (BackupMethod.LINK, BackupMethod.NONE)
+
+
+def reflink_file(source: Path, target: Path) -> bool:
+    """Create `target` as a copy-on-write clone of `source`.
+
+    Returns False, leaving no `target`, if the platform or filesystem does
+    not support cloning.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(source, "rb") as src, open(target, "xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copymode(source, target)
+            return True
+        except OSError:
+            pass
+    target.unlink()
+    return False
+
+
+def link_file(source: Path, target: Path) -> bool:
+    """Create `target` as a hard link to `source`.
+
+    Returns False if the filesystem does not support hard links.
+    """
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        raise
+    except OSError:
+        return False
+    return True
+
+
+def backup_paths(path: Path, backup_dir: Path | None = None) -> Iterator[Path]:
+    """Generate the backup names for `path`, in the order they are tried."""
+    directory = path.parent if backup_dir is None else backup_dir
+    yield directory / f"{path.stem} - backup{path.suffix}"
+    for backup_number in itertools.count(2):
+        yield directory / f"{path.stem} - backup ({backup_number}){path.suffix}"
+
+
+def copy_file(source: Path, target: Path) -> None:
+    """Copy `source` to a new file `target`.
+
+    The name is claimed with O_EXCL first, so an existing file is never
+    overwritten: FileExistsError is raised instead. If the copy fails,
+    `target` is removed again, so no empty or truncated backup is left.
+    """
+    os.close(os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+    try:
+        shutil.copyfile(source, target)
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+
+
+def append_backup_index(backup_dir: Path, path: Path, backup_path: Path) -> None:
+    record = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "original": str(path.resolve()),
+        "backup": backup_path.name,
+    }
+    with open(backup_dir / BACKUP_INDEX_NAME, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def create_backup(
+    path: Path,
+    method: BackupMethod = BackupMethod.COPY,
+    backup_dir: Path | None = None,
+) -> Path:
+    """Back up `path` next to it, or into `backup_dir` with an index entry.
+
+    REFLINK clones the file where the filesystem supports it. LINK makes the
+    backup a hard link to the original, which is safe because such files are
+    saved by renaming a new file over the original (see
+    `requires_atomic_save`), leaving the old contents to the backup. Both
+    fall back to a copy when unsupported.
+
+    Each backup name is created exclusively rather than checked first, so
+    the next free number costs no extra stat and two concurrent runs
+    never pick the same name.
+    """
+    if method is BackupMethod.NONE:
+        msg = "BackupMethod.NONE does not make a backup"
+        raise ValueError(msg)
+    if backup_dir is not None:
+        backup_dir.mkdir(parents=True, exist_ok=True)
+    for backup_path in backup_paths(path, backup_dir):
+        try:
+            cloned = (
+                method is BackupMethod.LINK and link_file(path, backup_path)
+            ) or (method is BackupMethod.REFLINK and reflink_file(path, backup_path))
+            if not cloned:
+                copy_file(path, backup_path)
+        except FileExistsError:
+            continue
+        break
+    if backup_dir is not None:
+        append_backup_index(backup_dir, path, backup_path)
+    return backup_path
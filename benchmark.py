@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from lxml import etree
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE
+from pptx.oxml.ns import qn
+from pptx.shapes.shapetree import GroupShapes, SlideShapes
+from pptx.text.text import _Run
+from pptx.util import Emu
+
+from apply_theme_fonts import compile_font_rules, process_presentation_with_rules
+from define_theme_fonts import update_theme_fonts
+from font_policy import FontPolicy
+from logger import Logger, LogLevel
+from replace_fonts import Engine, positive_int, process_pptx_file, save_presentation
+
+BENCHMARK_POLICY = FontPolicy(
+    major_latin="Arial", major_ea="Meiryo",
+    minor_latin="Arial", minor_ea="Meiryo",
+)
+BLANK_LAYOUT = 6
+SHAPE_ORIGIN = Emu(0)
+SHAPE_SIZE = Emu(914400)
+DEFAULT_TOLERANCE = 0.2
+
+
+@dataclass(frozen=True)
+class DeckSpec:
+    slides: int = 50
+    shapes: int = 10
+    runs: int = 5
+    table_rows: int = 0
+    table_cols: int = 0
+    charts: int = 0
+    group_depth: int = 0
+
+
+def _set_run(run: _Run, text: str) -> None:
+    run.text = text
+    run.font.name = "Calibri"
+    etree.SubElement(run.font._element, qn("a:ea"), typeface="MS Gothic")
+
+
+def _add_text_box(shapes: SlideShapes | GroupShapes, spec: DeckSpec) -> None:
+    text_box = shapes.add_textbox(SHAPE_ORIGIN, SHAPE_ORIGIN, SHAPE_SIZE, SHAPE_SIZE)
+    paragraph = text_box.text_frame.paragraphs[0]
+    for i in range(spec.runs):
+        _set_run(paragraph.add_run(), f"Run {i}")
+
+
+def generate_deck(path: Path, spec: DeckSpec) -> None:
+    """Write a synthetic deck whose every run needs its fonts replaced."""
+    presentation = Presentation()
+    layout = presentation.slide_layouts[BLANK_LAYOUT]
+    for _ in range(spec.slides):
+        shapes = presentation.slides.add_slide(layout).shapes
+        for _ in range(spec.shapes):
+            _add_text_box(shapes, spec)
+        if spec.table_rows and spec.table_cols:
+            table = shapes.add_table(
+                spec.table_rows, spec.table_cols,
+                SHAPE_ORIGIN, SHAPE_ORIGIN, SHAPE_SIZE, SHAPE_SIZE,
+            ).table
+            for row in table.rows:
+                for cell in row.cells:
+                    _set_run(cell.text_frame.paragraphs[0].add_run(), "Cell")
+        for _ in range(spec.charts):
+            chart_data = CategoryChartData()  # type: ignore[no-untyped-call]
+            chart_data.categories = ["A", "B", "C"]
+            chart_data.add_series("Series", (1, 2, 3))  # type: ignore[no-untyped-call]
+            chart = shapes.add_chart(
+                XL_CHART_TYPE.COLUMN_CLUSTERED,
+                SHAPE_ORIGIN, SHAPE_ORIGIN, SHAPE_SIZE, SHAPE_SIZE,
+                chart_data,
+            ).chart
+            chart.font.name = "Calibri"
+        if spec.group_depth:
+            group_shapes: SlideShapes | GroupShapes = shapes
+            for _ in range(spec.group_depth):
+                group_shapes = group_shapes.add_group_shape().shapes
+            _add_text_box(group_shapes, spec)
+    presentation.save(str(path))
+
+
+def count_elements(path: Path) -> tuple[int, int]:
+    """Return (slides, text runs) found in the deck's slide parts."""
+    slides = runs = 0
+    with zipfile.ZipFile(path) as pptx_zip:
+        for name in pptx_zip.namelist():
+            if name.startswith("ppt/slides/slide") and name.endswith(".xml"):
+                slides += 1
+                root = etree.fromstring(pptx_zip.read(name))
+                runs += sum(1 for _ in root.iter(qn("a:r")))
+    return slides, runs
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def _timed(timings: dict[str, float], name: str, func: Callable[[], Any]) -> Any:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    timings[name] = min(timings.get(name, elapsed), elapsed)
+    return result
+
+
+def run_benchmark(spec: DeckSpec, repeat: int = 3) -> dict[str, Any]:
+    """Time each phase on a freshly generated deck, keeping the best of `repeat`."""
+    timings: dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        work_dir = Path(tmpdir)
+        source = work_dir / "source.pptx"
+        generate_deck(source, spec)
+        slides, runs = count_elements(source)
+        with open(os.devnull, "w") as devnull:
+            for _ in range(repeat):
+                target = work_dir / "phases.pptx"
+                shutil.copyfile(source, target)
+                logger = Logger(devnull, console_level=LogLevel.QUIET)
+                presentation = _timed(
+                    timings, "open", partial(Presentation, str(target))
+                )
+                _timed(
+                    timings, "update_theme_fonts",
+                    partial(
+                        update_theme_fonts, presentation, BENCHMARK_POLICY, logger
+                    ),
+                )
+                _timed(
+                    timings, "process_presentation",
+                    partial(
+                        process_presentation_with_rules,
+                        presentation,
+                        compile_font_rules(True),
+                        logger,
+                    ),
+                )
+                _timed(
+                    timings, "save",
+                    partial(save_presentation, presentation, target),
+                )
+                for engine in Engine:
+                    target = work_dir / f"{engine.value}.pptx"
+                    shutil.copyfile(source, target)
+                    _timed(
+                        timings, f"process_pptx_file[{engine.value}]",
+                        partial(
+                            process_pptx_file, target, True,
+                            font_policy=BENCHMARK_POLICY, engine=engine,
+                            console_level=LogLevel.QUIET,
+                        ),
+                    )
+                    for leftover in work_dir.glob(f"{engine.value}*"):
+                        leftover.unlink()
+    process_time = timings["process_presentation"]
+    return {
+        "spec": asdict(spec),
+        "slides": slides,
+        "runs": runs,
+        "timings": timings,
+        "runs_per_sec": runs / process_time if process_time else None,
+        "slides_per_sec": slides / process_time if process_time else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def find_regressions(
+    result: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Return a message for each phase slower than baseline by over `tolerance`."""
+    regressions = []
+    for name, seconds in result["timings"].items():
+        base = baseline.get("timings", {}).get(name)
+        if base and seconds > base * (1 + tolerance):
+            regressions.append(
+                f"{name}: {seconds:.4f}s vs baseline {base:.4f}s "
+                f"(+{(seconds / base - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def print_result(result: dict[str, Any]) -> None:
+    print(f"Deck: {result['slides']} slides, {result['runs']} runs {result['spec']}")
+    for name, seconds in result["timings"].items():
+        print(f"  {name:<28} {seconds:10.4f} s")
+    if result["runs_per_sec"] is not None:
+        print(f"  {'runs/sec':<28} {result['runs_per_sec']:10.0f}")
+        print(f"  {'slides/sec':<28} {result['slides_per_sec']:10.1f}")
+    if result["peak_rss_mb"] is not None:
+        print(f"  {'peak RSS':<28} {result['peak_rss_mb']:10.1f} MB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark replace_fonts on a synthetic deck"
+    )
+    defaults = DeckSpec()
+    for field, value in asdict(defaults).items():
+        parser.add_argument(
+            f"--{field.replace('_', '-')}", type=int, default=value,
+            help=f"default: {value}",
+        )
+    parser.add_argument(
+        "--repeat", type=positive_int, default=3, metavar="N",
+        help="repetitions per phase (default: 3)",
+    )
+    parser.add_argument(
+        "--save-baseline", type=Path, metavar="FILE",
+        help="write the result as a baseline JSON file",
+    )
+    parser.add_argument(
+        "--baseline", type=Path, metavar="FILE",
+        help="compare against a baseline JSON file and fail on regressions",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_TOLERANCE,
+        help=f"allowed slowdown ratio (default: {DEFAULT_TOLERANCE})",
+    )
+    args = parser.parse_args()
+    spec = DeckSpec(**{field: getattr(args, field) for field in asdict(defaults)})
+
+    result = run_benchmark(spec, args.repeat)
+    print_result(result)
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"Baseline saved to {args.save_baseline}.")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("spec") != result["spec"]:
+            print("Error: baseline was recorded with a different deck spec.")
+            return 1
+        regressions = find_regressions(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
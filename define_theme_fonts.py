@@ -1,50 +1,18 @@
-from dataclasses import dataclass
-from pathlib import Path
-
-import yaml
 from lxml import etree
 from lxml.etree import _Element
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import Part
 from pptx.presentation import Presentation as PresentationType
 
+from apply_theme_fonts import FontScript
+from font_policy import EAST_ASIAN_SCRIPTS as EAST_ASIAN_SCRIPTS
+from font_policy import FontPolicy as FontPolicy
+from font_policy import load_font_policy as load_font_policy
 from logger import Logger
+from xml_package import XmlPackage
 
 A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
-EAST_ASIAN_SCRIPTS = ("Jpan", "Hang", "Hans", "Hant")
-THEME_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.theme+xml"
-
-
-@dataclass(frozen=True)
-class FontPolicy:
-    major_latin: str
-    major_ea: str
-    minor_latin: str
-    minor_ea: str
-
-
-def load_font_policy(path: Path) -> FontPolicy:
-    with open(path) as f:
-        data = yaml.safe_load(f)
-    if not isinstance(data, dict):
-        msg = "Font policy must be a YAML mapping"
-        raise ValueError(msg)
-    missing = []
-    for level in ("major", "minor"):
-        if not isinstance(data.get("theme_fonts", {}).get(level), dict):
-            missing.extend([f"theme_fonts.{level}.latin", f"theme_fonts.{level}.ea"])
-            continue
-        for key in ("latin", "ea"):
-            if key not in data["theme_fonts"][level]:
-                missing.append(f"theme_fonts.{level}.{key}")
-    if missing:
-        msg = f"Font policy missing required keys: {', '.join(missing)}"
-        raise ValueError(msg)
-    theme_fonts = data["theme_fonts"]
-    return FontPolicy(
-        major_latin=theme_fonts["major"]["latin"],
-        major_ea=theme_fonts["major"]["ea"],
-        minor_latin=theme_fonts["minor"]["latin"],
-        minor_ea=theme_fonts["minor"]["ea"],
-    )
+THEME_OWNER_RELTYPES = (RT.SLIDE_MASTER, RT.NOTES_MASTER, RT.HANDOUT_MASTER)
 
 
 def _update_theme_element(
@@ -52,50 +20,142 @@ def _update_theme_element(
     new_val: str,
     label: str,
     logger: Logger,
-) -> None:
+    theme_font: str,
+    font_script: FontScript,
+) -> bool:
     if element is None:
-        return
+        return False
     old = element.get("typeface")
-    if old != new_val:
+    changed: bool = old != new_val
+    if changed:
         logger.log(f'Update theme {label} from "{old}" to "{new_val}"')
         element.set("typeface", new_val)
+    logger.count_font_element(theme_font, font_script.value, changed)
+    return changed
 
 
-def update_theme_fonts(
-    presentation: PresentationType,
+def update_theme_element_fonts(
+    root: _Element,
     policy: FontPolicy,
     logger: Logger,
-) -> None:
+) -> int:
+    changes = 0
     font_configs = [
         ("major", f"{{{A_NS}}}majorFont", policy.major_latin, policy.major_ea),
         ("minor", f"{{{A_NS}}}minorFont", policy.minor_latin, policy.minor_ea),
     ]
-    for part in presentation.part.package.iter_parts():
-        if part.content_type != THEME_CONTENT_TYPE:
+    for level_name, font_tag, latin_val, ea_val in font_configs:
+        font_group = root.find(f".//{font_tag}")
+        if font_group is None:
             continue
-        root = etree.fromstring(part.blob)
-        for level_name, font_tag, latin_val, ea_val in font_configs:
-            font_group = root.find(f".//{font_tag}")
-            if font_group is None:
-                continue
-            _update_theme_element(
-                font_group.find(f"{{{A_NS}}}latin"),
-                latin_val, f"{level_name} latin", logger,
+        changes += _update_theme_element(
+            font_group.find(f"{{{A_NS}}}latin"),
+            latin_val, f"{level_name} latin", logger,
+            level_name, FontScript.LATIN,
+        )
+        changes += _update_theme_element(
+            font_group.find(f"{{{A_NS}}}ea"),
+            ea_val, f"{level_name} ea", logger,
+            level_name, FontScript.EAST_ASIAN,
+        )
+        for script in EAST_ASIAN_SCRIPTS:
+            el = font_group.find(
+                f"{{{A_NS}}}font[@script='{script}']",
+            )
+            changes += _update_theme_element(
+                el, ea_val,
+                f"{level_name} ea script {script}",
+                logger,
+                level_name, FontScript.EAST_ASIAN,
             )
-            _update_theme_element(
-                font_group.find(f"{{{A_NS}}}ea"),
-                ea_val, f"{level_name} ea", logger,
+    return changes
+
+
+def read_theme_fonts(root: _Element) -> dict[str, str]:
+    """Return the major and minor latin and east asian typefaces of a theme.
+
+    Keys are named like the `Stats` font counters (e.g. "major latin").
+    """
+    fonts = {}
+    for level_name in ("major", "minor"):
+        font_group = root.find(f".//{{{A_NS}}}{level_name}Font")
+        if font_group is None:
+            continue
+        for tag, font_script in (
+            ("latin", FontScript.LATIN),
+            ("ea", FontScript.EAST_ASIAN),
+        ):
+            el = font_group.find(f"{{{A_NS}}}{tag}")
+            if el is not None:
+                fonts[f"{level_name} {font_script.value}"] = el.get("typeface", "")
+    return fonts
+
+
+def theme_parts(presentation: PresentationType) -> list[Part]:
+    """Return the themes of the presentation and its masters.
+
+    Themes are found through the relationships of the presentation part and
+    its slide, notes and handout masters instead of walking every part.
+    """
+    presentation_part = presentation.part
+    owners = [presentation_part] + [
+        rel.target_part
+        for rel in presentation_part.rels.values()
+        if not rel.is_external and rel.reltype in THEME_OWNER_RELTYPES
+    ]
+    themes: dict[str, Part] = {}
+    for owner in owners:
+        for rel in owner.rels.values():
+            if not rel.is_external and rel.reltype == RT.THEME:
+                themes.setdefault(rel.target_part.partname, rel.target_part)
+    return list(themes.values())
+
+
+def update_theme_fonts(
+    presentation: PresentationType,
+    policy: FontPolicy,
+    logger: Logger,
+) -> int:
+    changes = 0
+    for part in theme_parts(presentation):
+        root = etree.fromstring(part.blob)
+        part_changes = update_theme_element_fonts(root, policy, logger)
+        if part_changes:
+            part._blob = etree.tostring(
+                root, xml_declaration=True,
+                encoding="UTF-8", standalone=True,
             )
-            for script in EAST_ASIAN_SCRIPTS:
-                el = font_group.find(
-                    f"{{{A_NS}}}font[@script='{script}']",
-                )
-                _update_theme_element(
-                    el, ea_val,
-                    f"{level_name} ea script {script}",
-                    logger,
-                )
-        part._blob = etree.tostring(
-            root, xml_declaration=True,
-            encoding="UTF-8", standalone=True,
+        changes += part_changes
+    return changes
+
+
+def package_theme_partnames(package: XmlPackage) -> list[str]:
+    """Return the theme partnames of the presentation and its masters."""
+    owners = [package.main_partname] + [
+        target
+        for _, reltype, target in package.rels(package.main_partname)
+        if reltype in THEME_OWNER_RELTYPES
+    ]
+    themes: dict[str, None] = {}
+    for owner in owners:
+        for _, reltype, target in package.rels(owner):
+            if reltype == RT.THEME:
+                themes.setdefault(target)
+    return list(themes)
+
+
+def update_package_theme_fonts(
+    package: XmlPackage,
+    policy: FontPolicy,
+    logger: Logger,
+) -> int:
+    changes = 0
+    for partname in package_theme_partnames(package):
+        part_changes = update_theme_element_fonts(
+            package.root(partname), policy, logger
         )
+        if part_changes:
+            package.mark_dirty(partname)
+        package.release(partname)
+        changes += part_changes
+    return changes
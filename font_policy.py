@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+EAST_ASIAN_SCRIPTS = ("Jpan", "Hang", "Hans", "Hant")
+
+
+@dataclass(frozen=True)
+class FontPolicy:
+    major_latin: str
+    major_ea: str
+    minor_latin: str
+    minor_ea: str
+    preserved_code_fonts: tuple[str, ...] = ()
+    code_font_replacements: tuple[tuple[str, str], ...] = ()
+
+
+def _load_code_fonts(data: dict[str, Any]) -> dict[str, Any]:
+    code_fonts = data.get("code_fonts") or {}
+    if not isinstance(code_fonts, dict):
+        msg = "Font policy code_fonts must be a mapping"
+        raise ValueError(msg)
+    preserve = code_fonts.get("preserve") or []
+    if not isinstance(preserve, list) or not all(
+        isinstance(font, str) for font in preserve
+    ):
+        msg = "Font policy code_fonts.preserve must be a list of font names"
+        raise ValueError(msg)
+    replace = code_fonts.get("replace") or {}
+    if not isinstance(replace, dict) or not all(
+        isinstance(font, str) for item in replace.items() for font in item
+    ):
+        msg = "Font policy code_fonts.replace must map font names to font names"
+        raise ValueError(msg)
+    return {
+        "preserved_code_fonts": tuple(preserve),
+        "code_font_replacements": tuple(replace.items()),
+    }
+
+
+def load_font_policy(path: Path) -> FontPolicy:
+    # Imported here so that yaml is loaded only when a policy is given
+    import yaml
+
+    with open(path) as f:
+        data = yaml.safe_load(f)
+    if not isinstance(data, dict):
+        msg = "Font policy must be a YAML mapping"
+        raise ValueError(msg)
+    missing = []
+    for level in ("major", "minor"):
+        if not isinstance(data.get("theme_fonts", {}).get(level), dict):
+            missing.extend([f"theme_fonts.{level}.latin", f"theme_fonts.{level}.ea"])
+            continue
+        for key in ("latin", "ea"):
+            if key not in data["theme_fonts"][level]:
+                missing.append(f"theme_fonts.{level}.{key}")
+    if missing:
+        msg = f"Font policy missing required keys: {', '.join(missing)}"
+        raise ValueError(msg)
+    theme_fonts = data["theme_fonts"]
+    return FontPolicy(
+        major_latin=theme_fonts["major"]["latin"],
+        major_ea=theme_fonts["major"]["ea"],
+        minor_latin=theme_fonts["minor"]["latin"],
+        minor_ea=theme_fonts["minor"]["ea"],
+        **_load_code_fonts(data),
+    )
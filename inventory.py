@@ -0,0 +1,123 @@
+import csv
+import json
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+from stats import Stats
+
+CSV_SUFFIX = ".csv"
+CSV_FIELDS = ("file", "kind", "font", "typeface", "count", "replaced", "error")
+
+
+def _totals(data: dict[str, Any]) -> tuple[int, int]:
+    visited = sum(counts["visited"] for counts in data["fonts"].values())
+    mutated = sum(counts["mutated"] for counts in data["fonts"].values())
+    return visited, mutated
+
+
+class InventoryWriter:
+    """Writes the font inventory of scanned files to a CSV or JSON Lines file.
+
+    There is one record (or, in CSV, a group of rows) per file as it is
+    scanned, and one for the whole corpus when the writer is closed. The
+    format is CSV if the file name ends in .csv and JSON Lines otherwise.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._file = path.open("w", newline="", encoding="utf-8")
+        self._csv = (
+            csv.writer(self._file) if path.suffix.lower() == CSV_SUFFIX else None
+        )
+        if self._csv is not None:
+            self._csv.writerow(CSV_FIELDS)
+        self._total = Stats()
+        self._files = 0
+        self._needs_changes = 0
+        self._errors = 0
+
+    def __enter__(self) -> "InventoryWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def _write_rows(self, csv_writer: Any, file: str, data: dict[str, Any]) -> None:
+        for name, typefaces in data["typefaces"].items():
+            for typeface, counts in typefaces.items():
+                csv_writer.writerow(
+                    (file, "font", name, typeface,
+                     counts["visited"], counts["mutated"], "")
+                )
+        for name, typefaces in data["theme_fonts"].items():
+            for typeface, count in typefaces.items():
+                csv_writer.writerow((file, "theme", name, typeface, count, "", ""))
+
+    def _write_record(self, record: dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def write_file(
+        self,
+        pptx_path: Path,
+        needs_changes: bool,
+        error: str | None,
+        data: dict[str, Any] | None,
+    ) -> None:
+        """Write the inventory of one file, and add it to the corpus totals."""
+        self._files += 1
+        self._needs_changes += needs_changes
+        self._errors += error is not None
+        if data is None:
+            data = Stats().as_dict()
+        self._total.merge(data)
+        visited, mutated = _totals(data)
+        if self._csv is not None:
+            self._csv.writerow(
+                (pptx_path, "file", "", "", visited, mutated, error or "")
+            )
+            self._write_rows(self._csv, str(pptx_path), data)
+            return
+        self._write_record(
+            {
+                "file": str(pptx_path),
+                "needs_changes": needs_changes,
+                "error": error,
+                "visited": visited,
+                "replaced": mutated,
+                "fonts": data["typefaces"],
+                "theme_fonts": data["theme_fonts"],
+            }
+        )
+
+    def close(self) -> None:
+        """Write the corpus totals and close the file."""
+        if self._file.closed:
+            return
+        data = self._total.as_dict()
+        visited, mutated = _totals(data)
+        if self._csv is not None:
+            self._csv.writerow(
+                ("", "files", "", "", self._files, self._needs_changes,
+                 self._errors or "")
+            )
+            self._csv.writerow(("", "file", "", "", visited, mutated, ""))
+            self._write_rows(self._csv, "", data)
+        else:
+            self._write_record(
+                {
+                    "file": None,
+                    "files": self._files,
+                    "needs_changes": self._needs_changes,
+                    "errors": self._errors,
+                    "visited": visited,
+                    "replaced": mutated,
+                    "fonts": data["typefaces"],
+                    "theme_fonts": data["theme_fonts"],
+                }
+            )
+        self._file.close()
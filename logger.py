@@ -1,14 +1,159 @@
-from datetime import datetime
-from typing import TextIO
+import json
+import sys
+import time
+from contextlib import AbstractContextManager, nullcontext
+from enum import IntEnum
+from types import TracebackType
+from typing import Any, TextIO
+
+from stats import Stats
+
+
+class LogLevel(IntEnum):
+    QUIET = 0
+    SUMMARY = 1
+    DETAIL = 2
 
 
 class Logger:
-    def __init__(self, log_file: TextIO) -> None:
+    def __init__(
+        self,
+        log_file: TextIO,
+        console_level: LogLevel = LogLevel.DETAIL,
+        file_level: LogLevel = LogLevel.DETAIL,
+        batch_size: int = 1,
+        action_file: TextIO | None = None,
+        source: str = "",
+        stats: Stats | None = None,
+    ) -> None:
         self._log_file = log_file
+        self._console_level = console_level
+        self._file_level = file_level
+        self._batch_size = batch_size
+        self._file_lines: list[str] = []
+        self._console_lines: list[str] = []
+        self._action_file = action_file
+        self._action_lines: list[str] = []
+        self._source = source
+        self._stats = stats
+        self._part: str | None = None
+        self._slide: int | None = None
+        self._shape_id: int | None = None
+        self._font_visits: list[tuple[Any, ...]] | None = None
+        self._second = -1
+        self._timestamp = ""
+
+    def __enter__(self) -> "Logger":
+        return self
 
-    def log(self, message: str, element_text: str | None = None) -> None:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.flush()
+
+    def _now(self) -> str:
+        second = int(time.time())
+        if second != self._second:
+            self._second = second
+            self._timestamp = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(second)
+            )
+        return self._timestamp
+
+    def log(
+        self,
+        message: str,
+        element_text: str | None = None,
+        level: LogLevel = LogLevel.DETAIL,
+    ) -> None:
+        to_file = level <= self._file_level
+        to_console = level <= self._console_level
+        if not (to_file or to_console):
+            return
         if element_text is not None:
             message = f"[{element_text}] {message}"
-        print(f"{timestamp} {message}", file=self._log_file)
-        print(f"{timestamp} {message}")
+        line = f"{self._now()} {message}\n"
+        if to_file:
+            self._file_lines.append(line)
+        if to_console:
+            self._console_lines.append(line)
+        if max(len(self._file_lines), len(self._console_lines)) >= self._batch_size:
+            self.flush()
+
+    def set_location(self, part: str | None, slide: int | None = None) -> None:
+        """Set the part (and slide number) that following actions belong to."""
+        self._part = part
+        self._slide = slide
+        self._shape_id = None
+
+    def set_shape_id(self, shape_id: int | None) -> None:
+        self._shape_id = shape_id
+
+    def collect_font_visits(self, visits: list[tuple[Any, ...]] | None) -> None:
+        """Append each font element visit to `visits`, or stop if None.
+
+        A visit is the current shape ID followed by the details given to
+        `visit_font_element`, enough to replay the actions taken.
+        """
+        self._font_visits = visits
+
+    def visit_font_element(self, *details: Any) -> None:
+        if self._font_visits is not None:
+            self._font_visits.append((self._shape_id, *details))
+
+    def record_action(
+        self,
+        theme_font: str,
+        font_script: str,
+        old_font: str | None,
+        new_font: str | None,
+    ) -> None:
+        """Write one JSON Lines record for a font action, if enabled."""
+        if self._action_file is None:
+            return
+        record = {
+            "file": self._source,
+            "part": self._part,
+            "slide": self._slide,
+            "shape_id": self._shape_id,
+            "theme_font": theme_font,
+            "script": font_script,
+            "old": old_font,
+            "new": new_font,
+            "action": "replace" if new_font else "preserve",
+        }
+        self._action_lines.append(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        )
+        if len(self._action_lines) >= self._batch_size:
+            self.flush()
+
+    def phase(self, name: str) -> AbstractContextManager[None]:
+        """Time the enclosed block as phase `name`, if stats are enabled."""
+        if self._stats is None:
+            return nullcontext()
+        return self._stats.phase(name)
+
+    def count_font_element(
+        self,
+        theme_font: str,
+        font_script: str,
+        mutated: bool,
+        typeface: str | None = None,
+    ) -> None:
+        if self._stats is not None:
+            self._stats.count(theme_font, font_script, mutated, typeface)
+
+    def flush(self) -> None:
+        if self._file_lines:
+            self._log_file.write("".join(self._file_lines))
+            self._file_lines.clear()
+        if self._console_lines:
+            sys.stdout.write("".join(self._console_lines))
+            self._console_lines.clear()
+        if self._action_lines and self._action_file is not None:
+            self._action_file.write("".join(self._action_lines))
+            self._action_lines.clear()
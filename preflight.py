@@ -0,0 +1,172 @@
+import html
+import re
+import zipfile
+from pathlib import Path
+
+from apply_theme_fonts import (
+    FONT_ELEMENT_PATTERN,
+    FontAction,
+    FontRules,
+    FontScript,
+    ThemeFont,
+)
+from font_policy import EAST_ASIAN_SCRIPTS, FontPolicy
+
+PML_NS = b"http://schemas.openxmlformats.org/presentationml/2006/main"
+XML_SUFFIX = ".xml"
+XML_SNIFF_SIZE = 8
+UTF8_BOM = b"\xef\xbb\xbf"
+UTF8_NAMES = (b"utf-8", b"utf8")
+XML_DECLARATION_SIZE = 100
+XML_ENCODING = re.compile(rb"""<\?xml[^>]*\bencoding=["']([\w.-]+)""")
+
+# Markers that decide which theme font a font element belongs to, in the
+# order they appear: shapes, their first placeholder and the title style.
+PART_TOKENS = re.compile(
+    rb"<(?P<end>/?)p:(?P<tag>sp|titleStyle)\b(?P<attrs>[^>]*)>"
+    rb"|<p:ph\b(?P<ph>[^>]*)>"
+    rb"|<(?:[\w.-]+:)?(?P<font>latin|ea)\b(?P<font_attrs>[^>]*)>"
+)
+THEME_FONT_GROUP = re.compile(
+    rb"<(?:[\w.-]+:)?(?P<level>major|minor)Font\b[^>]*>(?P<body>.*?)"
+    rb"</(?:[\w.-]+:)?(?P=level)Font>",
+    re.S,
+)
+THEME_FONT_ELEMENTS = re.compile(rb"<(?:[\w.-]+:)?(latin|ea|font)\b([^>]*)>")
+TYPEFACE = re.compile(rb"""\btypeface=(?:"([^"]*)"|'([^']*)')""")
+SCRIPT = re.compile(rb"""\bscript=(?:"([^"]*)"|'([^']*)')""")
+PH_TYPE = re.compile(rb"""\btype=(?:"([^"]*)"|'([^']*)')""")
+TITLE_PLACEHOLDER_TYPES = ("ctrTitle", "title")
+FONT_SCHEME = re.compile(rb"<(?:[\w.-]+:)?fontScheme\b")
+FONT_SCRIPTS = {b"latin": FontScript.LATIN, b"ea": FontScript.EAST_ASIAN}
+UNSUPPORTED_MARKUP = (b"<!--", b"<![CDATA[")
+
+
+def _attribute(pattern: re.Pattern[bytes], attrs: bytes) -> str | None:
+    match = pattern.search(attrs)
+    if match is None:
+        return None
+    value = match.group(1) if match.group(1) is not None else match.group(2)
+    text = value.decode(errors="replace")
+    return html.unescape(text) if "&" in text else text
+
+
+def _is_utf8(data: bytes) -> bool:
+    head = data.removeprefix(UTF8_BOM)[:XML_DECLARATION_SIZE]
+    if not head.startswith(b"<") or b"\0" in head:
+        return False
+    declaration = XML_ENCODING.match(head)
+    return declaration is None or declaration.group(1).lower() in UTF8_NAMES
+
+
+def _is_plain_xml(data: bytes) -> bool:
+    """Return True if the byte patterns can be trusted on `data`.
+
+    That is UTF-8 without comments or CDATA, with presentationml (if used)
+    bound to the usual `p` prefix only.
+    """
+    if not _is_utf8(data):
+        return False
+    if any(markup in data for markup in UNSUPPORTED_MARKUP):
+        return False
+    return data.count(PML_NS) == data.count(b'xmlns:p="' + PML_NS + b'"')
+
+
+def theme_is_compliant(data: bytes, font_policy: FontPolicy) -> bool:
+    """Return True if `update_theme_element_fonts` would leave the theme as is."""
+    expected = {
+        b"major": (font_policy.major_latin, font_policy.major_ea),
+        b"minor": (font_policy.minor_latin, font_policy.minor_ea),
+    }
+    seen: set[bytes] = set()
+    for group in THEME_FONT_GROUP.finditer(data):
+        level = group.group("level")
+        if level in seen:
+            continue
+        seen.add(level)
+        latin, ea = expected[level]
+        checked: set[bytes] = set()
+        for element in THEME_FONT_ELEMENTS.finditer(group.group("body")):
+            tag, attrs = element.groups()
+            if tag == b"font":
+                if _attribute(SCRIPT, attrs) not in EAST_ASIAN_SCRIPTS:
+                    continue
+                new_val = ea
+            elif tag in checked:
+                continue
+            else:
+                checked.add(tag)
+                new_val = latin if tag == b"latin" else ea
+            if _attribute(TYPEFACE, attrs) != new_val:
+                return False
+    return True
+
+
+def part_is_compliant(data: bytes, rules: FontRules) -> bool:
+    """Return True if no font element of the part would be replaced.
+
+    Font elements in a title placeholder shape or the title style belong to
+    the major theme font and all others to the minor one, as in
+    `apply_theme_fonts`. Elements that processing doesn't reach are checked
+    all the same, which can only make the check stricter.
+    """
+    if not _is_utf8(data):
+        return False
+    if FONT_ELEMENT_PATTERN.search(data) is None:
+        return True
+    if not _is_plain_xml(data):
+        return False
+    in_shape = in_title_style = shape_is_title = placeholder_seen = False
+    for token in PART_TOKENS.finditer(data):
+        tag = token.group("tag")
+        if tag is not None:
+            closed = token.group("end") == b"/" or token.group("attrs").endswith(b"/")
+            if tag == b"sp":
+                in_shape = not closed
+                shape_is_title = placeholder_seen = False
+            else:
+                in_title_style = not closed
+        elif token.group("ph") is not None:
+            if in_shape and not placeholder_seen:
+                placeholder_seen = True
+                ph_type = _attribute(PH_TYPE, token.group("ph"))
+                shape_is_title = ph_type in TITLE_PLACEHOLDER_TYPES
+        else:
+            major = (in_shape and shape_is_title) or (
+                in_title_style and not in_shape
+            )
+            action, _ = rules.lookup(
+                ThemeFont.MAJOR if major else ThemeFont.MINOR,
+                FONT_SCRIPTS[token.group("font")],
+                _attribute(TYPEFACE, token.group("font_attrs")),
+            )
+            if action is FontAction.REPLACE:
+                return False
+    return True
+
+
+def is_compliant(
+    pptx_path: Path, rules: FontRules, font_policy: FontPolicy | None = None
+) -> bool:
+    """Check from the raw part bytes that processing would change nothing.
+
+    No XML tree is built. Every entry that looks like XML is searched, not
+    only the parts processing would reach. A True result is reliable; False
+    only means the file could not be proven compliant this way.
+    """
+    with zipfile.ZipFile(pptx_path) as pptx_zip:
+        for info in pptx_zip.infolist():
+            if not info.filename.endswith(XML_SUFFIX):
+                with pptx_zip.open(info) as f:
+                    head = f.read(XML_SNIFF_SIZE)
+                if not head.removeprefix(UTF8_BOM).startswith(b"<"):
+                    continue
+            data = pptx_zip.read(info)
+            if FONT_SCHEME.search(data):
+                if font_policy is not None and not (
+                    _is_plain_xml(data) and theme_is_compliant(data, font_policy)
+                ):
+                    return False
+            elif not part_is_compliant(data, rules):
+                return False
+    return True
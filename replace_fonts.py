@@ -1,26 +1,146 @@
 import argparse
-import shutil
-import zipfile
+import io
+import os
+import sys
+from collections.abc import Callable, Iterator
+from contextlib import nullcontext, redirect_stdout, suppress
+from dataclasses import asdict
+from enum import Enum
+from fnmatch import fnmatch
+from functools import partial
 from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, TextIO
 
-from pptx import Presentation
-from pptx.exc import PackageNotFoundError
+from backup import BackupMethod, create_backup, requires_atomic_save
+from font_policy import FontPolicy, load_font_policy
+from inventory import InventoryWriter
+from logger import Logger, LogLevel
+from result_cache import DEFAULT_MAX_ENTRIES, FileDigest, ResultCache, file_digest
+from stats import Stats
 
-from apply_theme_fonts import process_presentation
-from define_theme_fonts import FontPolicy, load_font_policy, update_theme_fonts
-from logger import Logger
+# python-pptx, lxml and the modules built on them take most of the startup
+# time, so they are imported by the functions that process decks. Options,
+# the font policy and errors are handled before any of them is loaded.
+if TYPE_CHECKING:
+    from pptx.presentation import Presentation as PresentationType
+
+    from apply_theme_fonts import FontRules
+    from xml_package import XmlPackage
 
 __version__ = "2026-04-01"
 
+LOG_BATCH_SIZE = 256
+DEFAULT_INCLUDE = "*.pptx"
+BACKUP_PATTERN = "* - backup*.pptx"
+JOBS_IN_FLIGHT_PER_WORKER = 2
+STDIN_NAME = "-"
+STDIN_LABEL = "standard input"
+
+
+class Engine(Enum):
+    PPTX = "pptx"
+    XML = "xml"
+
+
+def save_presentation(
+    presentation: "PresentationType", pptx_path: Path, atomic: bool = False
+) -> None:
+    """Save `presentation` over `pptx_path` by streaming the original zip.
+
+    XML parts are re-serialized; every other entry, including all media, is
+    copied from the original file as raw compressed bytes. Falls back to
+    `Presentation.save` if the parts no longer match the original file.
+    See `replace_file` for `atomic`.
+    """
+    from xml_package import XmlPackage, replace_file
+
+    with XmlPackage(pptx_path) as package:
+        if set_presentation_blobs(presentation, package):
+            package.save(pptx_path, atomic)
+            return
+    replace_file(pptx_path, presentation.save, atomic)
+
+
+def set_presentation_blobs(
+    presentation: "PresentationType", package: "XmlPackage"
+) -> bool:
+    """Set the blobs of `presentation`'s changed parts on its source `package`.
+
+    Returns False, setting nothing, if the parts do not match the package.
+    """
+    from pptx.opc.package import XmlPart
 
-def create_backup(path: Path) -> Path:
-    backup_path = path.with_stem(f"{path.stem} - backup")
-    backup_number = 2
-    while backup_path.exists():
-        backup_path = path.with_stem(f"{path.stem} - backup ({backup_number})")
-        backup_number += 1
-    shutil.copyfile(path, backup_path)
-    return backup_path
+    parts = list(presentation.part.package.iter_parts())
+    if not all(package.has_part(part.partname.lstrip("/")) for part in parts):
+        return False
+    for part in parts:
+        partname = part.partname.lstrip("/")
+        if isinstance(part, XmlPart) or (
+            part.content_type.endswith("xml")
+            and part.blob != package.read(partname)
+        ):
+            package.set_blob(partname, part.blob)
+    return True
+
+
+def font_rules(
+    preserve_code_fonts: bool, font_policy: FontPolicy | None
+) -> "FontRules":
+    from apply_theme_fonts import compile_font_rules
+
+    if font_policy is None:
+        return compile_font_rules(preserve_code_fonts)
+    return compile_font_rules(
+        preserve_code_fonts,
+        font_policy.preserved_code_fonts,
+        font_policy.code_font_replacements,
+    )
+
+
+def log_opened(pptx_path: Path | str, dry_run: bool, logger: Logger) -> None:
+    if dry_run:
+        logger.log(f"{pptx_path} was opened. (dry run)", level=LogLevel.SUMMARY)
+    else:
+        logger.log(f"{pptx_path} was opened.", level=LogLevel.SUMMARY)
+
+
+def backup_pptx_file(
+    pptx_path: Path,
+    logger: Logger,
+    method: BackupMethod = BackupMethod.COPY,
+    backup_dir: Path | None = None,
+) -> None:
+    if method is BackupMethod.NONE:
+        return
+    with logger.phase("backup"):
+        backup_path = create_backup(pptx_path, method, backup_dir)
+    logger.log(
+        f"{pptx_path} was backed up to {backup_path}.", level=LogLevel.SUMMARY
+    )
+
+
+def save_pptx_file(
+    pptx_path: Path,
+    modified: bool,
+    save: Callable[[], None],
+    backup: Callable[[], None],
+    dry_run: bool,
+    skip_unchanged: bool,
+    logger: Logger,
+) -> None:
+    if dry_run:
+        return
+    if skip_unchanged:
+        if not modified:
+            logger.log(
+                f"{pptx_path} needs no changes. (backup and save skipped)",
+                level=LogLevel.SUMMARY,
+            )
+            return
+        backup()
+    with logger.phase("save"):
+        save()
+    logger.log(f"{pptx_path} was saved.", level=LogLevel.SUMMARY)
 
 
 def process_pptx_file(
@@ -28,39 +148,349 @@ def process_pptx_file(
     preserve_code_fonts: bool,
     dry_run: bool = False,
     font_policy: FontPolicy | None = None,
-) -> None:
+    engine: Engine = Engine.PPTX,
+    skip_unchanged: bool = False,
+    console_level: LogLevel = LogLevel.DETAIL,
+    file_level: LogLevel = LogLevel.DETAIL,
+    write_jsonl: bool = False,
+    stats: Stats | None = None,
+    backup_method: BackupMethod = BackupMethod.COPY,
+    backup_dir: Path | None = None,
+    low_memory: bool = False,
+    preflight: bool = False,
+    atomic_save: bool = False,
+) -> bool:
+    """Replace the fonts of one file and log what was done next to it.
+
+    If `stats` is given, phase timings and font element counters are added
+    to it. `low_memory` implies the xml engine (see `XmlPackage`). With
+    `preflight`, a file whose raw part XML shows it is already compliant is
+    left alone without being parsed, backed up or logged. `atomic_save`
+    renames the saved file over the original instead of overwriting it in
+    place; it is implied by a LINK backup or none (see `requires_atomic_save`).
+    Returns True if any font (or theme font) was changed.
+    """
+    from pptx import Presentation
+
+    from apply_theme_fonts import (
+        process_package_with_rules,
+        process_presentation_with_rules,
+    )
+    from define_theme_fonts import update_package_theme_fonts, update_theme_fonts
+    from preflight import is_compliant
+    from xml_package import XmlPackage
+
+    if low_memory:
+        engine = Engine.XML
+    atomic_save = atomic_save or requires_atomic_save(backup_method)
+    rules = font_rules(preserve_code_fonts, font_policy)
+    if preflight and is_compliant(pptx_path, rules, font_policy):
+        if console_level >= LogLevel.SUMMARY:
+            print(f"{pptx_path} is already compliant. (preflight)")
+        return False
     log_path = pptx_path.with_suffix(".log")
-    with open(log_path, "a") as log_file:
-        logger = Logger(log_file)
+    jsonl_path = pptx_path.with_suffix(".jsonl")
+    with (
+        open(log_path, "a") as log_file,
+        open(jsonl_path, "a", encoding="utf-8")
+        if write_jsonl else nullcontext() as jsonl_file,
+        Logger(
+            log_file, console_level, file_level, LOG_BATCH_SIZE,
+            action_file=jsonl_file, source=str(pptx_path), stats=stats,
+        ) as logger,
+    ):
+        backup = partial(
+            backup_pptx_file, pptx_path, logger, backup_method, backup_dir
+        )
+        if not dry_run and not skip_unchanged:
+            backup()
+
+        if engine is Engine.XML:
+            with logger.phase("open"):
+                package = XmlPackage(pptx_path, low_memory)
+            with package:
+                log_opened(pptx_path, dry_run, logger)
+                if font_policy is not None:
+                    with logger.phase("theme"):
+                        update_package_theme_fonts(package, font_policy, logger)
+                process_package_with_rules(package, rules, logger)
+                save_pptx_file(
+                    pptx_path, package.modified,
+                    partial(package.save, pptx_path, atomic_save),
+                    backup, dry_run, skip_unchanged, logger,
+                )
+                return package.modified
+
+        with logger.phase("open"):
+            presentation = Presentation(str(pptx_path))
+        log_opened(pptx_path, dry_run, logger)
+
+        changes = 0
+        if font_policy is not None:
+            with logger.phase("theme"):
+                changes += update_theme_fonts(presentation, font_policy, logger)
+
+        changes += process_presentation_with_rules(presentation, rules, logger)
 
-        if not dry_run:
-            backup_path = create_backup(pptx_path)
-            logger.log(f"{pptx_path} was backed up to {backup_path}.")
+        save_pptx_file(
+            pptx_path, changes > 0,
+            partial(save_presentation, presentation, pptx_path, atomic_save),
+            backup, dry_run, skip_unchanged, logger,
+        )
+        return changes > 0
 
-        presentation = Presentation(str(pptx_path))
+
+def process_pptx_stream(
+    source: IO[bytes],
+    destination: IO[bytes],
+    preserve_code_fonts: bool,
+    log_file: TextIO,
+    font_policy: FontPolicy | None = None,
+    engine: Engine = Engine.PPTX,
+    file_level: LogLevel = LogLevel.DETAIL,
+    low_memory: bool = False,
+    label: str = STDIN_LABEL,
+    dry_run: bool = False,
+) -> bool:
+    """Replace the fonts of a deck read from `source` and write it to `destination`.
+
+    Nothing is written to disk: there is no backup, the log goes to
+    `log_file`, and a non-seekable `source` (such as a pipe) is buffered in
+    memory. `destination` need not be seekable. The deck is written even if
+    nothing changed, unless `dry_run` is set. The log refers to the deck as
+    `label`. `low_memory` implies the xml engine, as in `process_pptx_file`.
+    Returns True if any font (or theme font) was changed.
+    """
+    from pptx import Presentation
+
+    from apply_theme_fonts import (
+        process_package_with_rules,
+        process_presentation_with_rules,
+    )
+    from define_theme_fonts import update_package_theme_fonts, update_theme_fonts
+    from xml_package import XmlPackage
+
+    if not source.seekable():
+        source = io.BytesIO(source.read())
+    if low_memory:
+        engine = Engine.XML
+    rules = font_rules(preserve_code_fonts, font_policy)
+    with Logger(log_file, LogLevel.QUIET, file_level, LOG_BATCH_SIZE) as logger:
+        if engine is Engine.XML:
+            with XmlPackage(source, low_memory) as package:
+                log_opened(label, dry_run, logger)
+                if font_policy is not None:
+                    update_package_theme_fonts(package, font_policy, logger)
+                process_package_with_rules(package, rules, logger)
+                if not dry_run:
+                    package.write(destination)
+                return package.modified
+
+        presentation = Presentation(source)
+        log_opened(label, dry_run, logger)
+        changes = 0
+        if font_policy is not None:
+            changes += update_theme_fonts(presentation, font_policy, logger)
+        changes += process_presentation_with_rules(presentation, rules, logger)
         if dry_run:
-            logger.log(f"{pptx_path} was opened. (dry run)")
-        else:
-            logger.log(f"{pptx_path} was opened.")
+            return changes > 0
+        with XmlPackage(source) as package:
+            if set_presentation_blobs(presentation, package):
+                package.write(destination)
+            else:
+                presentation.save(destination)
+        return changes > 0
+
+
+def scan_pptx_file(
+    pptx_path: Path,
+    preserve_code_fonts: bool,
+    font_policy: FontPolicy | None = None,
+    stats: Stats | None = None,
+) -> bool:
+    """Count the fonts of one file without changing it or writing a log.
+
+    Only the part XML is read, as with the xml engine, and each part is
+    dropped once counted. The counts, including each typeface seen and the
+    theme typefaces, go to `stats`.
+    Returns True if the file needs changes.
+    """
+    from apply_theme_fonts import process_package_with_rules
+    from define_theme_fonts import (
+        package_theme_partnames,
+        read_theme_fonts,
+        update_package_theme_fonts,
+    )
+    from xml_package import XmlPackage
 
+    rules = font_rules(preserve_code_fonts, font_policy)
+    with (
+        XmlPackage(pptx_path, read_only=True) as package,
+        Logger(io.StringIO(), LogLevel.QUIET, LogLevel.QUIET, stats=stats) as logger,
+    ):
+        if stats is not None:
+            for partname in package_theme_partnames(package):
+                theme_fonts = read_theme_fonts(package.root(partname))
+                for name, typeface in theme_fonts.items():
+                    stats.count_theme_font(name, typeface)
         if font_policy is not None:
-            update_theme_fonts(presentation, font_policy, logger)
+            update_package_theme_fonts(package, font_policy, logger)
+        process_package_with_rules(package, rules, logger)
+        return package.modified
+
+
+def try_process_pptx_file(
+    process: Callable[..., bool], pptx_path: Path, stats: Stats | None = None
+) -> tuple[bool, str | None]:
+    """Run `process` on one file, turning failures into an error message.
+
+    Returns (modified, error message or None).
+    """
+    import zipfile
+
+    from pptx.exc import PackageNotFoundError
+
+    try:
+        return process(pptx_path, stats=stats), None
+    except FileNotFoundError:
+        return False, f"Error: File not found: {pptx_path}"
+    except (PackageNotFoundError, zipfile.BadZipFile, KeyError):
+        return False, f"Error: Invalid PowerPoint file: {pptx_path}"
+    except Exception as e:
+        return False, f"Error processing {pptx_path}: {type(e).__name__}: {e}"
 
-        process_presentation(presentation, preserve_code_fonts, logger)
 
-        if not dry_run:
-            presentation.save(str(pptx_path))
-            logger.log(f"{pptx_path} was saved.")
+def run_job(
+    process: Callable[..., bool],
+    pptx_path: Path,
+    collect_stats: bool = False,
+    collect_digest: bool = False,
+) -> tuple[str, bool, str | None, dict[str, Any] | None, FileDigest | None]:
+    """Process one file in a worker process, capturing its console output.
+
+    The captured output (and stats, if collected) is returned to the parent
+    so that each file's lines are printed as one block instead of
+    interleaving with other workers. With `collect_digest`, the processed
+    file is also hashed here, so that the parent can cache it without
+    reading it again; the digest is None if processing or hashing failed.
+    """
+    output = io.StringIO()
+    stats = Stats() if collect_stats else None
+    with redirect_stdout(output):
+        modified, error = try_process_pptx_file(process, pptx_path, stats)
+    digest = None
+    if collect_digest and error is None:
+        with suppress(OSError):
+            digest = file_digest(pptx_path)
+    return (
+        output.getvalue(), modified, error, stats.as_dict() if stats else None,
+        digest,
+    )
+
+
+def _matches_any(name: str, relative_path: str, patterns: list[str]) -> bool:
+    return any(
+        fnmatch(name, pattern) or fnmatch(relative_path, pattern)
+        for pattern in patterns
+    )
+
+
+def report_unreadable_directory(directory: Path, error: OSError) -> None:
+    print(f"Error: Cannot read directory {directory}: {error.strerror}")
+
+
+def discover_pptx_files(
+    directory: Path,
+    include: list[str],
+    exclude: list[str],
+    on_error: Callable[[Path, OSError], None] = report_unreadable_directory,
+) -> Iterator[Path]:
+    """Generate files under `directory` matching `include`, as they are found.
+
+    Patterns are matched against both the file name and the path relative
+    to `directory`. Directories matching `exclude` are not entered, symbolic
+    links to directories are not followed, and backups made by
+    `create_backup` are skipped. Subdirectories that cannot be read are
+    passed to `on_error` and skipped; raises OSError if `directory` itself
+    cannot be.
+    """
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError as e:
+            if current is directory:
+                raise
+            on_error(current, e)
+            continue
+        with entries:
+            for entry in entries:
+                path = Path(entry.path)
+                relative_path = path.relative_to(directory).as_posix()
+                if _matches_any(entry.name, relative_path, exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(path)
+                elif (
+                    entry.is_file()
+                    and _matches_any(entry.name, relative_path, include)
+                    and not fnmatch(entry.name, BACKUP_PATTERN)
+                ):
+                    yield path
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        msg = f"must be a positive integer: {value}"
+        raise argparse.ArgumentTypeError(msg)
+    return number
 
 
 def main() -> int:
-    print(f"replace_fonts - version {__version__} by Shinichi Akiyama")
+    args = build_parser().parse_args()
+    if STDIN_NAME in args.files:
+        # The deck is written to standard output, so messages go to stderr.
+        deck_output = sys.stdout.buffer
+        with redirect_stdout(sys.stderr):
+            return _main(args, deck_output)
+    return _main(args, None)
 
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Replace fonts in PowerPoint presentations"
     )
     parser.add_argument(
-        "files", nargs="*", metavar="FILE", help="PowerPoint (.pptx) files to process"
+        "files",
+        nargs="*",
+        metavar="FILE",
+        help="PowerPoint (.pptx) files to process, "
+        f"or {STDIN_NAME} to read standard input and write standard output",
+    )
+    parser.add_argument(
+        "--recursive",
+        help="process files found under DIR and its subdirectories "
+        "(may be given more than once)",
+        type=Path,
+        action="append",
+        default=[],
+        metavar="DIR",
+    )
+    parser.add_argument(
+        "--include",
+        help="pattern of files to process with --recursive "
+        f"(default: {DEFAULT_INCLUDE})",
+        action="append",
+        metavar="PATTERN",
+    )
+    parser.add_argument(
+        "--exclude",
+        help="pattern of files or directories to skip with --recursive",
+        action="append",
+        default=[],
+        metavar="PATTERN",
     )
     parser.add_argument("--code", help="preserve code fonts", action="store_true")
     parser.add_argument(
@@ -73,7 +503,126 @@ def main() -> int:
         help="YAML file defining font policy for theme fonts",
         type=Path,
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        help="number of files to process in parallel (default: 1)",
+        type=positive_int,
+        default=1,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--engine",
+        help="font replacement engine: pptx (python-pptx object model) or "
+        "xml (direct part XML, faster on large decks) (default: pptx)",
+        choices=[engine.value for engine in Engine],
+        default=Engine.PPTX.value,
+    )
+    parser.add_argument(
+        "--low-memory",
+        help="release each part as soon as it is processed, keeping memory "
+        "use flat on very large decks (implies --engine xml)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--skip-unchanged",
+        help="back up and save only files whose fonts were actually changed",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--preflight",
+        help="skip files whose XML shows they are already compliant, "
+        "without parsing, backing up or logging them",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--backup",
+        help="how backups are made: copy, reflink (copy-on-write clone), "
+        "link (hard link; implies --atomic-save) or "
+        "none (rely on the atomic save alone; implies --atomic-save) "
+        "(default: copy)",
+        choices=[method.value for method in BackupMethod],
+        default=BackupMethod.COPY.value,
+    )
+    parser.add_argument(
+        "--backup-dir",
+        help="make backups in DIR, recorded in DIR/index.jsonl, "
+        "instead of next to each file",
+        type=Path,
+        metavar="DIR",
+    )
+    parser.add_argument(
+        "--atomic-save",
+        help="flush each saved file to disk and rename it over the original, "
+        "so an interrupted save never truncates it; the file then gets a new "
+        "inode, so hard links to it keep the old contents and its owner "
+        "becomes the current user",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache",
+        help="cache file recording files already known to be compliant",
+        type=Path,
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--cache-size",
+        help=f"maximum number of cache entries (default: {DEFAULT_MAX_ENTRIES})",
+        type=positive_int,
+        default=DEFAULT_MAX_ENTRIES,
+        metavar="N",
+    )
+    log_levels = [level.name.lower() for level in LogLevel]
+    parser.add_argument(
+        "--console-level",
+        help="verbosity of console output (default: detail)",
+        choices=log_levels,
+        default=LogLevel.DETAIL.name.lower(),
+    )
+    parser.add_argument(
+        "--log-level",
+        help="verbosity of .log files (default: detail)",
+        choices=log_levels,
+        default=LogLevel.DETAIL.name.lower(),
+    )
+    parser.add_argument(
+        "--jsonl",
+        help="also write one JSON Lines record per font action to a .jsonl file",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--stats",
+        help="print time spent per phase and font elements visited and changed",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--scan",
+        help="only scan files, without changing them or writing logs, and "
+        "write a font inventory to FILE (CSV if it ends in .csv, otherwise "
+        "JSON Lines)",
+        type=Path,
+        metavar="FILE",
+    )
+    return parser
+
+
+def _stdin_conflicts(args: argparse.Namespace) -> list[str]:
+    """Return the options given that have no effect on standard input."""
+    return [
+        option
+        for option, given in (
+            ("--jobs", args.jobs > 1),
+            ("--cache", args.cache is not None),
+            ("--jsonl", args.jsonl),
+            ("--stats", args.stats),
+            ("--scan", args.scan is not None),
+        )
+        if given
+    ]
+
+
+def _main(args: argparse.Namespace, deck_output: IO[bytes] | None) -> int:
+    print(f"replace_fonts - version {__version__} by Shinichi Akiyama")
+
     preserve_code_fonts = args.code
     dry_run = args.dry_run
     font_policy_path: Path | None = args.font_policy
@@ -85,27 +634,205 @@ def main() -> int:
             print(f"Error: {e}")
             return 1
 
-    if not args.files:
+    if not args.files and not args.recursive:
         print("No files specified.")
         return 0
 
-    success_count = 0
-    failure_count = 0
+    engine = Engine.XML if args.low_memory else Engine(args.engine)
+    if deck_output is not None:
+        if args.files != [STDIN_NAME] or args.recursive:
+            print(f"Error: {STDIN_NAME} cannot be combined with other files.")
+            return 1
+        conflicts = _stdin_conflicts(args)
+        if conflicts:
+            print(f"Error: {', '.join(conflicts)} cannot be used with {STDIN_NAME}.")
+            return 1
+        import zipfile
+
+        from pptx.exc import PackageNotFoundError
 
-    for pptx_path_str in args.files:
-        pptx_path = Path(pptx_path_str)
         try:
-            process_pptx_file(pptx_path, preserve_code_fonts, dry_run, font_policy)
-            success_count += 1
-        except FileNotFoundError:
-            print(f"Error: File not found: {pptx_path}")
-            failure_count += 1
+            process_pptx_stream(
+                sys.stdin.buffer,
+                deck_output,
+                preserve_code_fonts,
+                sys.stderr,
+                font_policy,
+                engine,
+                LogLevel[args.log_level.upper()],
+                args.low_memory,
+                dry_run=dry_run,
+            )
         except (PackageNotFoundError, zipfile.BadZipFile, KeyError):
-            print(f"Error: Invalid PowerPoint file: {pptx_path}")
-            failure_count += 1
+            print(f"Error: Invalid PowerPoint file: {STDIN_LABEL}")
+            return 1
         except Exception as e:
-            print(f"Error processing {pptx_path}: {type(e).__name__}: {e}")
+            print(f"Error processing {STDIN_LABEL}: {type(e).__name__}: {e}")
+            return 1
+        deck_output.flush()
+        return 0
+
+    process: partial[bool] = partial(
+        process_pptx_file,
+        preserve_code_fonts=preserve_code_fonts,
+        dry_run=dry_run,
+        font_policy=font_policy,
+        engine=engine,
+        skip_unchanged=args.skip_unchanged,
+        console_level=LogLevel[args.console_level.upper()],
+        file_level=LogLevel[args.log_level.upper()],
+        write_jsonl=args.jsonl,
+        backup_method=BackupMethod(args.backup),
+        backup_dir=args.backup_dir,
+        low_memory=args.low_memory,
+        preflight=args.preflight,
+        atomic_save=args.atomic_save,
+    )
+    inventory: InventoryWriter | None = None
+    if args.scan is not None:
+        process = partial(
+            scan_pptx_file,
+            preserve_code_fonts=preserve_code_fonts,
+            font_policy=font_policy,
+        )
+        inventory = InventoryWriter(args.scan)
+    cache: ResultCache | None = None
+    if args.cache is not None and inventory is None:
+        cache = ResultCache(
+            args.cache,
+            {
+                "version": __version__,
+                "code": preserve_code_fonts,
+                "font_policy": asdict(font_policy) if font_policy else None,
+            },
+            args.cache_size,
+        )
+    stats = Stats() if args.stats else None
+    collect_stats = stats is not None or inventory is not None
+    success_count = 0
+    failure_count = 0
+    needs_changes_count = 0
+
+    def record(
+        pptx_path: Path,
+        modified: bool,
+        error: str | None,
+        file_stats: dict[str, Any] | None,
+        digest: FileDigest | None = None,
+    ) -> None:
+        nonlocal success_count, failure_count, needs_changes_count
+        if stats is not None and file_stats is not None:
+            stats.merge(file_stats)
+        if inventory is not None:
+            inventory.write_file(pptx_path, modified, error, file_stats)
+            needs_changes_count += modified
+        if error is not None:
+            print(error)
             failure_count += 1
+            return
+        success_count += 1
+        if cache is not None and not (dry_run and modified):
+            cache.mark_compliant(pptx_path, digest)
+
+    def directory_failed(directory: Path, error: OSError) -> None:
+        nonlocal failure_count
+        report_unreadable_directory(directory, error)
+        failure_count += 1
+
+    def input_paths() -> Iterator[Path]:
+        for pptx_path_str in args.files:
+            yield Path(pptx_path_str)
+        include = args.include or [DEFAULT_INCLUDE]
+        for directory in args.recursive:
+            try:
+                yield from discover_pptx_files(
+                    directory, include, args.exclude, directory_failed
+                )
+            except OSError as e:
+                directory_failed(directory, e)
+
+    def pending_paths() -> Iterator[Path]:
+        nonlocal success_count
+        for pptx_path in input_paths():
+            if cache is not None and cache.is_compliant(pptx_path):
+                print(f"{pptx_path} is already compliant. (cached)")
+                success_count += 1
+                continue
+            yield pptx_path
+
+    if args.jobs > 1:
+        from concurrent.futures import (
+            FIRST_COMPLETED,
+            Future,
+            ProcessPoolExecutor,
+            wait,
+        )
+        from concurrent.futures.process import BrokenProcessPool
+
+        # Submit only a few jobs ahead of the workers so that processing
+        # starts while discovery is still walking the directories.
+        max_in_flight = args.jobs * JOBS_IN_FLIGHT_PER_WORKER
+        futures: dict[Future[tuple[str, bool, str | None, Any, Any]], Path] = {}
+        # Saved files are hashed by their worker rather than read again here
+        collect_digest = cache is not None and not dry_run
+
+        def collect_one() -> None:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                pptx_path = futures.pop(future)
+                try:
+                    output, modified, error, file_stats, digest = future.result()
+                except Exception as e:
+                    # The job never ran to completion, e.g. its worker died
+                    output, modified, file_stats, digest = "", False, None, None
+                    error = (
+                        f"Error processing {pptx_path}: {type(e).__name__}: {e}"
+                    )
+                print(output, end="")
+                record(pptx_path, modified, error, file_stats, digest)
+
+        executor = ProcessPoolExecutor(max_workers=args.jobs)
+        try:
+            for pptx_path in pending_paths():
+                try:
+                    future = executor.submit(
+                        run_job, process, pptx_path, collect_stats, collect_digest
+                    )
+                except BrokenProcessPool:
+                    # Jobs lost with the old pool fail in collect_one().
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=args.jobs)
+                    future = executor.submit(
+                        run_job, process, pptx_path, collect_stats, collect_digest
+                    )
+                futures[future] = pptx_path
+                if len(futures) >= max_in_flight:
+                    collect_one()
+            while futures:
+                collect_one()
+        finally:
+            executor.shutdown()
+    else:
+        for pptx_path in pending_paths():
+            file_stats = Stats() if collect_stats else None
+            modified, error = try_process_pptx_file(process, pptx_path, file_stats)
+            record(
+                pptx_path, modified, error,
+                file_stats.as_dict() if file_stats else None,
+            )
+
+    if cache is not None:
+        cache.save()
+
+    if inventory is not None:
+        inventory.close()
+        print(
+            f"{needs_changes_count} file(s) need changes. "
+            f"Inventory written to {args.scan}."
+        )
+
+    if stats is not None:
+        print("\n".join(stats.summary()))
 
     total = success_count + failure_count
     if failure_count > 0:
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_ENTRIES = 100_000
+HASH_CHUNK_SIZE = 1 << 20
+
+# (mtime in ns, size, SHA-256) of a file, as the cache records it
+FileDigest = tuple[int, int, str]
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_digest(path: Path) -> FileDigest:
+    """Stat and hash `path`, so that another process can mark it compliant."""
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size, file_sha256(path)
+
+
+class ResultCache:
+    """On-disk record of files already known to be compliant.
+
+    Entries are keyed by the file's SHA-256 plus a digest of the options that
+    affect the result, so a compliant file is recognized wherever it lives.
+    A per-path (mtime, size) record lets unchanged files skip hashing, and
+    both tables are bounded with least-recently-used eviction.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        options: dict[str, Any],
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self._path = path
+        self._options_digest = hashlib.sha256(
+            json.dumps(options, sort_keys=True).encode()
+        ).hexdigest()
+        self._max_entries = max_entries
+        self._stats: OrderedDict[str, FileDigest] = OrderedDict()
+        self._compliant: OrderedDict[str, None] = OrderedDict()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self._path) as f:
+                data = json.load(f)
+            if data.get("version") != CACHE_FORMAT_VERSION:
+                return
+            for key, mtime_ns, size, sha256 in data["stats"]:
+                self._stats[key] = (mtime_ns, size, sha256)
+            for key in data["compliant"]:
+                self._compliant[key] = None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self._stats.clear()
+            self._compliant.clear()
+
+    def save(self) -> None:
+        data = {
+            "version": CACHE_FORMAT_VERSION,
+            "stats": [[key, *value] for key, value in self._stats.items()],
+            "compliant": list(self._compliant),
+        }
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(
+            dir=self._path.parent, prefix=f".{self._path.name}-", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_name, self._path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _content_sha256(self, pptx_path: Path) -> str:
+        stat = pptx_path.stat()
+        key = str(pptx_path.resolve())
+        cached = self._stats.get(key)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            self._stats.move_to_end(key)
+            return cached[2]
+        sha256 = file_sha256(pptx_path)
+        self._stats[key] = (stat.st_mtime_ns, stat.st_size, sha256)
+        self._evict(self._stats)
+        return sha256
+
+    def _key(self, pptx_path: Path) -> str:
+        return f"{self._content_sha256(pptx_path)}:{self._options_digest}"
+
+    def _evict(self, table: OrderedDict[str, Any]) -> None:
+        while len(table) > self._max_entries:
+            table.popitem(last=False)
+
+    def is_compliant(self, pptx_path: Path) -> bool:
+        try:
+            key = self._key(pptx_path)
+        except OSError:
+            return False
+        if key not in self._compliant:
+            return False
+        self._compliant.move_to_end(key)
+        return True
+
+    def mark_compliant(self, pptx_path: Path, digest: FileDigest | None = None) -> None:
+        """Record `pptx_path` as compliant.
+
+        `digest`, if given, is the file's `file_digest` taken after it was
+        processed, and saves hashing the file again.
+        """
+        try:
+            if digest is not None:
+                stats_key = str(pptx_path.resolve())
+                self._stats[stats_key] = digest
+                self._stats.move_to_end(stats_key)
+                self._evict(self._stats)
+            key = self._key(pptx_path)
+        except OSError:
+            return
+        self._compliant[key] = None
+        self._compliant.move_to_end(key)
+        self._evict(self._compliant)
@@ -0,0 +1,274 @@
+import argparse
+import ipaddress
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from font_policy import load_font_policy
+from replace_fonts import Engine, __version__, positive_int, process_pptx_file, run_job
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 16
+JOBS_CONTENT_TYPE = "application/json"
+JOBS_PATH = "/jobs"
+STATUS_PATH = "/status"
+RETRY_AFTER_SECONDS = 1
+
+
+class JobError(ValueError):
+    pass
+
+
+def parse_job(data: Any) -> tuple[Path, partial[bool]]:
+    """Turn a job request body into (file path, process function).
+
+    The body is a JSON object with `path` and optional `code`, `font_policy`
+    (a YAML file path), `engine`, `dry_run` and `skip_unchanged` fields.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("path"), str):
+        msg = "Job must be a JSON object with a string 'path'"
+        raise JobError(msg)
+    for key in ("code", "dry_run", "skip_unchanged"):
+        if not isinstance(data.get(key, False), bool):
+            msg = f"'{key}' must be a boolean"
+            raise JobError(msg)
+    try:
+        engine = Engine(data.get("engine", Engine.PPTX.value))
+    except ValueError:
+        msg = f"Unknown engine: {data.get('engine')}"
+        raise JobError(msg) from None
+    font_policy = None
+    if data.get("font_policy") is not None:
+        try:
+            font_policy = load_font_policy(Path(data["font_policy"]))
+        except (OSError, ValueError, TypeError, yaml.YAMLError) as e:
+            raise JobError(str(e)) from e
+    process = partial(
+        process_pptx_file,
+        preserve_code_fonts=data.get("code", False),
+        dry_run=data.get("dry_run", False),
+        font_policy=font_policy,
+        engine=engine,
+        skip_unchanged=data.get("skip_unchanged", False),
+    )
+    return Path(data["path"]), process
+
+
+def is_loopback_host(host: str) -> bool:
+    """Return whether `host` only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class JobServer(ThreadingHTTPServer):
+    """Local HTTP server that runs font replacement jobs on a worker pool.
+
+    Python and its dependencies are loaded once per worker process instead of
+    once per file. At most `jobs` files are processed at a time and up to
+    `queue_size` more wait for a worker; further jobs are rejected with
+    503 Service Unavailable until a slot frees up. If a worker dies, the
+    pool is replaced so that later jobs still run.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        jobs: int = 1,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        super().__init__(address, JobHandler)
+        self.jobs = jobs
+        self.executor = ProcessPoolExecutor(max_workers=jobs)
+        self.capacity = jobs + queue_size
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self.pending = 0
+
+    def run(self, pptx_path: Path, process: partial[bool]) -> dict[str, Any] | None:
+        """Run one job and wait for its result, or return None if full.
+
+        Raises whatever the worker pool raised if the job could not be run.
+        """
+        if not self.slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            self.pending += 1
+        executor = self.executor
+        try:
+            output, modified, error, _, _ = executor.submit(
+                run_job, process, pptx_path
+            ).result()
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+            raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+            self.slots.release()
+        return {
+            "path": str(pptx_path),
+            "modified": modified,
+            "error": error,
+            "output": output,
+        }
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self.executor is not broken:
+                return
+            self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+        broken.shutdown(wait=False)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.executor.shutdown()
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    server: JobServer
+
+    def _send_json(
+        self,
+        status: HTTPStatus,
+        body: dict[str, Any],
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        content = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self) -> None:
+        if self.path != STATUS_PATH:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+        self._send_json(
+            HTTPStatus.OK,
+            {
+                "version": __version__,
+                "pending": self.server.pending,
+                "capacity": self.server.capacity,
+            },
+        )
+
+    def do_POST(self) -> None:
+        if self.path != JOBS_PATH:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+        # Browsers cannot send application/json to another origin without
+        # the preflight this server never answers, so web pages cannot submit
+        # jobs.
+        if self.headers.get_content_type() != JOBS_CONTENT_TYPE:
+            self._send_json(
+                HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                {"error": f"Content-Type must be {JOBS_CONTENT_TYPE}"},
+            )
+            return
+        try:
+            length = int(self.headers.get("Content-Length", -1))
+            if length < 0:
+                msg = "Content-Length must be given and not negative"
+                raise ValueError(msg)
+            pptx_path, process = parse_job(json.loads(self.rfile.read(length)))
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        try:
+            result = self.server.run(pptx_path, process)
+        except Exception as e:
+            self._send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"error": f"Job failed: {type(e).__name__}: {e}"},
+            )
+            return
+        if result is None:
+            self._send_json(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                {"error": "Job queue is full"},
+                {"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+            return
+        self._send_json(HTTPStatus.OK, result)
+
+
+def main() -> int:
+    print(f"replace_fonts server - version {__version__} by Shinichi Akiyama")
+
+    parser = argparse.ArgumentParser(
+        description="Serve font replacement jobs over local HTTP. Jobs are "
+        "not authenticated: anyone who can connect can rewrite any deck this "
+        "user can write, so only listen on a loopback address."
+    )
+    parser.add_argument(
+        "--host",
+        help=f"address to listen on (default: {DEFAULT_HOST}); addresses "
+        "other than loopback need --allow-remote",
+        default=DEFAULT_HOST,
+    )
+    parser.add_argument(
+        "--allow-remote",
+        help="allow --host to be an address that other machines can reach; "
+        "they can then submit jobs without authentication",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--port",
+        help=f"port to listen on (default: {DEFAULT_PORT})",
+        type=int,
+        default=DEFAULT_PORT,
+    )
+    parser.add_argument(
+        "--jobs",
+        help="number of files to process in parallel (default: 1)",
+        type=positive_int,
+        default=1,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--queue-size",
+        help="number of jobs that may wait for a worker before new jobs "
+        f"are rejected (default: {DEFAULT_QUEUE_SIZE})",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        metavar="N",
+    )
+    args = parser.parse_args()
+    if args.queue_size < 0:
+        parser.error("--queue-size must not be negative")
+    if not args.allow_remote and not is_loopback_host(args.host):
+        parser.error(
+            f"--host {args.host} is reachable from other machines and jobs are "
+            "not authenticated; use --allow-remote to listen on it anyway"
+        )
+
+    with JobServer((args.host, args.port), args.jobs, args.queue_size) as server:
+        host, port = server.server_address[:2]
+        print(f"Listening on http://{host!s}:{port}{JOBS_PATH}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Shutting down.")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
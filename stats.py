@@ -0,0 +1,113 @@
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+
+class Stats:
+    """Wall time per phase and font element counters for one or more files.
+
+    Each font element examined is counted as visited, and as mutated if its
+    typeface was changed, both under the current phase and under its theme
+    font and script (e.g. "minor latin"). If the element's typeface is given,
+    it is also counted under that typeface ("" for none), and the typefaces
+    set in themes are counted separately, making up a font inventory.
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, dict[str, float]] = {}
+        self.fonts: dict[str, dict[str, int]] = {}
+        self.typefaces: dict[str, dict[str, dict[str, int]]] = {}
+        self.theme_fonts: dict[str, dict[str, int]] = {}
+        self._phase: dict[str, float] | None = None
+
+    def _phase_entry(self, name: str) -> dict[str, float]:
+        return self.phases.setdefault(
+            name, {"seconds": 0.0, "visited": 0, "mutated": 0}
+        )
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        outer = self._phase
+        self._phase = self._phase_entry(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phase["seconds"] += time.perf_counter() - start
+            self._phase = outer
+
+    def count(
+        self,
+        theme_font: str,
+        font_script: str,
+        mutated: bool,
+        typeface: str | None = None,
+    ) -> None:
+        name = f"{theme_font} {font_script}"
+        font = self.fonts.setdefault(name, {"visited": 0, "mutated": 0})
+        font["visited"] += 1
+        font["mutated"] += mutated
+        if self._phase is not None:
+            self._phase["visited"] += 1
+            self._phase["mutated"] += mutated
+        if typeface is not None:
+            counts = self.typefaces.setdefault(name, {}).setdefault(
+                typeface, {"visited": 0, "mutated": 0}
+            )
+            counts["visited"] += 1
+            counts["mutated"] += mutated
+
+    def count_theme_font(self, name: str, typeface: str) -> None:
+        """Count a theme's typeface for `name` (e.g. "major latin")."""
+        typefaces = self.theme_fonts.setdefault(name, {})
+        typefaces[typeface] = typefaces.get(typeface, 0) + 1
+
+    def merge(self, data: dict[str, Any]) -> None:
+        """Add the counters of another `as_dict` result to this one."""
+        for name, values in data["phases"].items():
+            phase = self._phase_entry(name)
+            for key, value in values.items():
+                phase[key] += value
+        for name, values in data["fonts"].items():
+            font = self.fonts.setdefault(name, {"visited": 0, "mutated": 0})
+            for key, value in values.items():
+                font[key] += value
+        for name, typefaces in data["typefaces"].items():
+            for typeface, values in typefaces.items():
+                counts = self.typefaces.setdefault(name, {}).setdefault(
+                    typeface, {"visited": 0, "mutated": 0}
+                )
+                for key, value in values.items():
+                    counts[key] += value
+        for name, typefaces in data["theme_fonts"].items():
+            for typeface, count in typefaces.items():
+                theme_typefaces = self.theme_fonts.setdefault(name, {})
+                theme_typefaces[typeface] = theme_typefaces.get(typeface, 0) + count
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "phases": {name: dict(values) for name, values in self.phases.items()},
+            "fonts": {name: dict(values) for name, values in self.fonts.items()},
+            "typefaces": {
+                name: {typeface: dict(values) for typeface, values in typefaces.items()}
+                for name, typefaces in self.typefaces.items()
+            },
+            "theme_fonts": {
+                name: dict(typefaces) for name, typefaces in self.theme_fonts.items()
+            },
+        }
+
+    def summary(self) -> list[str]:
+        lines = ["Stats:"]
+        for name, values in self.phases.items():
+            lines.append(
+                f"  {name:<16} {values['seconds']:9.3f} s "
+                f"{values['visited']:9.0f} visited {values['mutated']:9.0f} mutated"
+            )
+        for name, counts in sorted(self.fonts.items()):
+            lines.append(
+                f"  {name:<16} {'':11} "
+                f"{counts['visited']:9} visited {counts['mutated']:9} mutated"
+            )
+        return lines
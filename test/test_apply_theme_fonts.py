@@ -0,0 +1,242 @@
+import io
+import json
+import zipfile
+from copy import deepcopy
+from pathlib import Path
+
+import pytest
+from lxml import etree
+from pptx import Presentation
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from test_replace_fonts import normalize_log
+
+from apply_theme_fonts import (
+    TABLE,
+    FontAction,
+    FontScript,
+    ThemeFont,
+    compile_font_rules,
+    process_presentation,
+    process_presentation_with_rules,
+    replace_shape_fonts,
+    replace_tbl_fonts,
+    replace_txbody_fonts,
+)
+from benchmark import DeckSpec, generate_deck
+from logger import Logger, LogLevel
+from replace_fonts import Engine, process_pptx_file
+from stats import Stats
+
+SAMPLE_DIR = Path(__file__).parent / "original"
+
+TABLE_FRAME_XML = (
+    f"<p:graphicFrame {nsdecls('a', 'p')}><a:graphic><a:graphicData><a:tbl>"
+    "<a:tblPr/><a:tr><a:tc><a:txBody><a:bodyPr/><a:lstStyle><a:lvl1pPr>"
+    '<a:defRPr><a:latin typeface="Arial"/></a:defRPr></a:lvl1pPr></a:lstStyle>'
+    '<a:p><a:pPr><a:defRPr><a:ea typeface="MS Gothic"/></a:defRPr></a:pPr>'
+    '<a:br><a:rPr><a:latin typeface="Tahoma"/></a:rPr></a:br>'
+    '<a:r><a:rPr><a:latin typeface="Courier New"/><a:ea typeface="Meiryo"/>'
+    "</a:rPr><a:t> one </a:t></a:r><a:br/>"
+    '<a:r><a:rPr><a:latin typeface="Verdana"/></a:rPr><a:t>two</a:t></a:r>'
+    '<a:endParaRPr><a:latin typeface="Georgia"/></a:endParaRPr></a:p>'
+    '<a:p><a:br><a:rPr><a:ea typeface="SimSun"/></a:rPr></a:br></a:p>'
+    "</a:txBody><a:tcPr/></a:tc>"
+    '<a:tc><a:txBody><a:bodyPr/><a:p><a:r><a:rPr><a:latin typeface="Impact"/>'
+    "</a:rPr><a:t>three</a:t></a:r></a:p></a:txBody></a:tc></a:tr>"
+    "</a:tbl></a:graphicData></a:graphic></p:graphicFrame>"
+)
+
+
+def test_default_rules() -> None:
+    """Test that fonts other than the theme font are replaced with it."""
+    rules = compile_font_rules(False)
+
+    assert rules.lookup(ThemeFont.MINOR, FontScript.LATIN, "+mn-lt") == (
+        FontAction.KEEP,
+        None,
+    )
+    assert rules.lookup(ThemeFont.MAJOR, FontScript.EAST_ASIAN, "Consolas") == (
+        FontAction.REPLACE,
+        "+mj-ea",
+    )
+    assert rules.lookup(ThemeFont.MINOR, FontScript.LATIN, None) == (
+        FontAction.REPLACE,
+        "+mn-lt",
+    )
+
+
+def test_code_font_rules() -> None:
+    """Test that code fonts and user-defined code fonts are applied."""
+    rules = compile_font_rules(
+        True,
+        ("Source Code Pro",),
+        (("Lucida Console", "Consolas"), ("Source Code Pro", "Consolas")),
+    )
+
+    for font in ("Consolas", "Source Code Pro"):
+        assert rules.lookup(ThemeFont.MINOR, FontScript.LATIN, font) == (
+            FontAction.PRESERVE,
+            None,
+        )
+    for font in ("Courier New", "Lucida Console"):
+        assert rules.lookup(ThemeFont.MAJOR, FontScript.LATIN, font) == (
+            FontAction.REPLACE,
+            "Consolas",
+        )
+    assert compile_font_rules(True) is compile_font_rules(True)
+
+
+@pytest.mark.parametrize("preserve_code_fonts", [True, False])
+def test_replacement_targets_are_preserved(preserve_code_fonts: bool) -> None:
+    """Test that policy mappings apply and their targets are left alone."""
+    rules = compile_font_rules(
+        preserve_code_fonts, (), (("Lucida Console", "Fira Code"),)
+    )
+
+    assert rules.lookup(ThemeFont.MAJOR, FontScript.LATIN, "Lucida Console") == (
+        FontAction.REPLACE,
+        "Fira Code",
+    )
+    assert rules.lookup(ThemeFont.MAJOR, FontScript.LATIN, "Fira Code") == (
+        FontAction.PRESERVE,
+        None,
+    )
+    assert rules.lookup(ThemeFont.MINOR, FontScript.LATIN, "Courier New") == (
+        (FontAction.REPLACE, "Consolas")
+        if preserve_code_fonts
+        else (FontAction.REPLACE, "+mn-lt")
+    )
+
+
+def _log_messages(log_file: io.StringIO) -> list[str]:
+    return [line.split(" ", 2)[2] for line in log_file.getvalue().splitlines()]
+
+
+def test_table_fonts_match_cell_text_bodies() -> None:
+    """Test that the one-pass table walk matches processing cell by cell."""
+    rules = compile_font_rules(True)
+    results = []
+    for one_pass in (True, False):
+        frame = parse_xml(TABLE_FRAME_XML)
+        table = TABLE(frame)[0]
+        log_file = io.StringIO()
+        with Logger(log_file, console_level=LogLevel.QUIET) as logger:
+            if one_pass:
+                changes = replace_tbl_fonts(table, rules, logger)
+            else:
+                changes = sum(
+                    replace_txbody_fonts(txbody, ThemeFont.MINOR, rules, logger)
+                    for txbody in table.iter("{*}txBody")
+                )
+        results.append((changes, _log_messages(log_file), etree.tostring(frame)))
+
+    assert results[0] == results[1]
+    assert results[0][0] == 9
+    assert results[0][1][-1] == "[three] Replace minor latin from Impact to +mn-lt"
+
+
+def test_run_text_control_characters_are_escaped() -> None:
+    """Test that run text is logged with control characters escaped."""
+    run = (
+        '<a:r><a:rPr><a:latin typeface="Arial"/></a:rPr>'
+        "<a:t> line&#13;break\ttab </a:t></a:r>"
+    )
+    txbody = parse_xml(f"<p:txBody {nsdecls('a', 'p')}><a:p>{run}</a:p></p:txBody>")
+    frame = parse_xml(
+        TABLE_FRAME_XML.replace("<a:p><a:r>", f"<a:p>{run}<a:r>", 1)
+    )
+    rules = compile_font_rules(False)
+    log_file = io.StringIO()
+    with Logger(log_file, console_level=LogLevel.QUIET) as logger:
+        replace_txbody_fonts(txbody, ThemeFont.MINOR, rules, logger)
+        replace_tbl_fonts(TABLE(frame)[0], rules, logger)
+
+    expected = "[line_x000D_break\ttab] Replace minor latin from Arial to +mn-lt"
+    assert _log_messages(log_file).count(expected) == 2
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_duplicate_layouts_are_processed_once(tmp_path: Path, engine: Engine) -> None:
+    """Test that actions on a layout are replayed to an identical layout."""
+    pptx_path = tmp_path / "duplicates.pptx"
+    presentation = Presentation()
+    layouts = presentation.slide_master.slide_layouts
+    rpr = layouts[0].element.find(f".//{qn('a:rPr')}")
+    etree.SubElement(rpr, qn("a:latin"), typeface="Calibri")
+    layouts[1].part._element = deepcopy(layouts[0].element)
+    presentation.save(str(pptx_path))
+    stats = Stats()
+
+    process_pptx_file(
+        pptx_path, preserve_code_fonts=False, engine=engine,
+        write_jsonl=True, stats=stats,
+    )
+
+    log_content = pptx_path.with_suffix(".log").read_text()
+    assert log_content.count("from Calibri to +mj-lt") == 2
+    records = [
+        json.loads(line)
+        for line in pptx_path.with_suffix(".jsonl").read_text().splitlines()
+    ]
+    assert [record["part"] for record in records if record["old"] == "Calibri"] == [
+        "ppt/slideLayouts/slideLayout1.xml",
+        "ppt/slideLayouts/slideLayout2.xml",
+    ]
+    assert stats.as_dict()["typefaces"]["major latin"]["Calibri"]["mutated"] == 2
+    assert "Same as Slide Layout 1 of Slide Master 1" in log_content
+    assert "Found 1 duplicate slide layout." in log_content
+    with zipfile.ZipFile(pptx_path) as pptx_zip:
+        layout_xml = pptx_zip.read("ppt/slideLayouts/slideLayout2.xml")
+    assert b'typeface="+mj-lt"' in layout_xml
+    assert b"Calibri" not in layout_xml
+
+
+def test_nested_groups_match_between_engines(tmp_path: Path) -> None:
+    """Test that shapes in deeply nested groups are handled by both engines."""
+    logs = []
+    for engine in Engine:
+        pptx_path = tmp_path / engine.name / "deck.pptx"
+        pptx_path.parent.mkdir()
+        generate_deck(pptx_path, DeckSpec(slides=1, shapes=1, runs=1, group_depth=100))
+        process_pptx_file(pptx_path, preserve_code_fonts=False, engine=engine)
+        log_content = normalize_log(pptx_path.with_suffix(".log").read_text())
+        logs.append(log_content.replace(engine.name, ""))
+
+    assert logs[0] == logs[1]
+    assert logs[0].count("[Run 0] Replace minor latin from Calibri to +mn-lt") == 2
+
+
+@pytest.mark.parametrize("preserve_code_fonts", [False, True])
+def test_flag_api_matches_rules_api(preserve_code_fonts: bool) -> None:
+    """Test that the --code flag functions match their *_with_rules versions."""
+    results = []
+    for with_rules in (True, False):
+        presentation = Presentation(str(SAMPLE_DIR / "sample1.pptx"))
+        log_file = io.StringIO()
+        with Logger(log_file, console_level=LogLevel.QUIET) as logger:
+            if with_rules:
+                changes = process_presentation_with_rules(
+                    presentation, compile_font_rules(preserve_code_fonts), logger
+                )
+            else:
+                changes = process_presentation(
+                    presentation, preserve_code_fonts, logger
+                )
+        slides = [etree.tostring(slide.element) for slide in presentation.slides]
+        results.append((changes, _log_messages(log_file), slides))
+
+    assert results[0] == results[1]
+    assert results[0][0] > 0
+
+
+def test_replace_shape_fonts() -> None:
+    """Test that a single shape can be processed with the --code flag."""
+    presentation = Presentation(str(SAMPLE_DIR / "sample1.pptx"))
+    shapes = [shape for slide in presentation.slides for shape in slide.shapes]
+    with Logger(io.StringIO(), console_level=LogLevel.QUIET) as logger:
+        changes = [replace_shape_fonts(shape, True, logger) for shape in shapes]
+        repeated = [replace_shape_fonts(shape, True, logger) for shape in shapes]
+
+    assert sum(changes) > 0
+    assert sum(repeated) == 0
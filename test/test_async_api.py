@@ -0,0 +1,109 @@
+import asyncio
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+from test_xml_package import _zip_entries
+
+import async_api
+from async_api import AsyncFontReplacer, process_pptx
+from replace_fonts import Engine, process_pptx_file
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_process_pptx_matches_sync(
+    workspace: tuple[Path, Path], engine: Engine
+) -> None:
+    """Test that the async API saves the same deck as process_pptx_file."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    sync_path = work_dir / "sample1_sync.pptx"
+    shutil.copy(pptx_path, sync_path)
+
+    assert asyncio.run(process_pptx(pptx_path, True, engine=engine))
+    process_pptx_file(sync_path, True, engine=engine)
+
+    assert _zip_entries(pptx_path) == _zip_entries(sync_path)
+    assert (work_dir / "sample1 - backup.pptx").exists()
+    log_content = pptx_path.with_suffix(".log").read_text()
+    assert f"{pptx_path} was opened." in log_content
+    assert log_content.rstrip().endswith(f"{pptx_path} was saved.")
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_process_pptx_in_process_pool(
+    workspace: tuple[Path, Path], low_memory: bool
+) -> None:
+    """Test concurrent files rewritten in a process pool."""
+    work_dir, _ = workspace
+    pptx_paths = sorted(work_dir.glob("sample*.pptx"))
+
+    async def process_all() -> list[bool]:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            replacer = AsyncFontReplacer(executor, max_concurrency=2)
+            return await asyncio.gather(
+                *(
+                    replacer.process_pptx(
+                        path, True, engine=Engine.XML, low_memory=low_memory
+                    )
+                    for path in pptx_paths
+                )
+            )
+
+    assert all(asyncio.run(process_all()))
+    for path in pptx_paths:
+        assert path.with_suffix(".log").read_text().rstrip().endswith("was saved.")
+
+
+def test_process_pptx_timeout(workspace: tuple[Path, Path]) -> None:
+    """Test that a file is left untouched when the timeout expires."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    original_content = pptx_path.read_bytes()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(process_pptx(pptx_path, True, timeout=0))
+
+    assert pptx_path.read_bytes() == original_content
+    assert list(work_dir.glob("*backup*")) == []
+    assert list(work_dir.glob(".*.tmp")) == []
+
+
+def test_timed_out_rewrite_keeps_its_slot(
+    workspace: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a rewrite still running after a timeout blocks the next file."""
+    work_dir, _ = workspace
+    first, second = sorted(work_dir.glob("sample*.pptx"))[:2]
+    original_content = first.read_bytes()
+    rewrite = async_api.rewrite_pptx_file
+    release = threading.Event()
+    started: list[Path] = []
+
+    def blocking_rewrite(
+        pptx_path: Path, *args: Any, **kwargs: Any
+    ) -> tuple[bool, Path | None, str]:
+        started.append(pptx_path)
+        if pptx_path == first:
+            release.wait(10)
+        return rewrite(pptx_path, *args, **kwargs)
+
+    monkeypatch.setattr(async_api, "rewrite_pptx_file", blocking_rewrite)
+
+    async def process_both() -> bool:
+        replacer = AsyncFontReplacer()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(replacer.process_pptx(first, True), 0.1)
+        waiting = asyncio.ensure_future(replacer.process_pptx(second, True))
+        await asyncio.sleep(0.2)
+        assert started == [first]
+        release.set()
+        return await waiting
+
+    assert asyncio.run(process_both())
+    assert started == [first, second]
+    assert first.read_bytes() == original_content
+    assert list(work_dir.glob(".*.tmp")) == []
@@ -0,0 +1,189 @@
+import errno
+import json
+import os
+import stat
+from pathlib import Path
+from typing import IO
+
+import pytest
+
+from backup import BACKUP_INDEX_NAME, BackupMethod, create_backup
+from replace_fonts import Engine, process_pptx_file
+from xml_package import replace_file
+
+
+@pytest.mark.parametrize(
+    "method", [method for method in BackupMethod if method is not BackupMethod.NONE]
+)
+def test_backup_keeps_original_content(
+    workspace: tuple[Path, Path], method: BackupMethod
+) -> None:
+    """Test that every backup method keeps the original after saving."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    original_content = pptx_path.read_bytes()
+
+    process_pptx_file(pptx_path, preserve_code_fonts=True, backup_method=method)
+
+    assert (work_dir / "sample1 - backup.pptx").read_bytes() == original_content
+    assert pptx_path.read_bytes() != original_content
+
+
+def test_link_backup_shares_original_inode(workspace: tuple[Path, Path]) -> None:
+    """Test that a link backup is the original file, not a copy of it."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    original_inode = pptx_path.stat().st_ino
+
+    backup_path = create_backup(pptx_path, BackupMethod.LINK)
+
+    assert backup_path.stat().st_ino == original_inode
+
+
+def test_backup_dir_index(workspace: tuple[Path, Path], tmp_path: Path) -> None:
+    """Test that backups in a separate directory are numbered and indexed."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    backup_dir = tmp_path / "backups"
+
+    first = create_backup(pptx_path, backup_dir=backup_dir)
+    second = create_backup(pptx_path, backup_dir=backup_dir)
+
+    assert first == backup_dir / "sample1 - backup.pptx"
+    assert second == backup_dir / "sample1 - backup (2).pptx"
+    assert not list(work_dir.glob("*backup*"))
+    lines = (backup_dir / BACKUP_INDEX_NAME).read_text().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record["backup"] for record in records] == [first.name, second.name]
+    assert all(record["original"] == str(pptx_path.resolve()) for record in records)
+
+
+@pytest.mark.parametrize(
+    "method", [method for method in BackupMethod if method is not BackupMethod.NONE]
+)
+def test_backup_numbering_never_overwrites(
+    workspace: tuple[Path, Path], method: BackupMethod
+) -> None:
+    """Test that each backup method takes the next free name."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    (work_dir / "sample1 - backup.pptx").write_bytes(b"older backup")
+
+    backup_path = create_backup(pptx_path, method)
+
+    assert backup_path == work_dir / "sample1 - backup (2).pptx"
+    assert backup_path.read_bytes() == pptx_path.read_bytes()
+    assert (work_dir / "sample1 - backup.pptx").read_bytes() == b"older backup"
+
+
+@pytest.mark.parametrize(
+    "method", [method for method in BackupMethod if method is not BackupMethod.NONE]
+)
+def test_missing_source_leaves_no_backup(tmp_path: Path, method: BackupMethod) -> None:
+    """Test that backing up a missing file does not leave an empty backup."""
+    with pytest.raises(FileNotFoundError):
+        create_backup(tmp_path / "missing.pptx", method)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_copy_leaves_no_backup(
+    workspace: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a copy failing partway removes the truncated backup."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+
+    def copy_partially(source: Path, target: Path) -> None:
+        with open(target, "wb") as f:
+            f.write(source.read_bytes()[:100])
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr("shutil.copyfile", copy_partially)
+    with pytest.raises(OSError, match="No space left"):
+        create_backup(pptx_path)
+
+    assert list(work_dir.glob("*backup*")) == []
+
+
+def test_no_backup(workspace: tuple[Path, Path]) -> None:
+    """Test that BackupMethod.NONE saves without making a backup."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    original_content = pptx_path.read_bytes()
+
+    process_pptx_file(
+        pptx_path, preserve_code_fonts=True, backup_method=BackupMethod.NONE
+    )
+
+    assert pptx_path.read_bytes() != original_content
+    assert not list(work_dir.glob("*backup*"))
+    assert "was backed up" not in pptx_path.with_suffix(".log").read_text()
+
+
+@pytest.mark.parametrize("atomic", [False, True])
+def test_failed_save_keeps_original(
+    workspace: tuple[Path, Path], atomic: bool
+) -> None:
+    """Test that a save failing midway leaves the original and no temp file."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    original_content = pptx_path.read_bytes()
+    files = sorted(work_dir.iterdir())
+
+    def write_partially(file: IO[bytes]) -> None:
+        file.write(original_content[:100])
+        raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        replace_file(pptx_path, write_partially, atomic)
+
+    assert pptx_path.read_bytes() == original_content
+    assert sorted(work_dir.iterdir()) == files
+
+
+def test_unsupported_directory_fsync_is_ignored(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a directory fsync the filesystem rejects doesn't fail the save."""
+    path = tmp_path / "deck.pptx"
+    fsync = os.fsync
+
+    def fsync_files_only(fd: int) -> None:
+        if stat.S_ISDIR(os.fstat(fd).st_mode):
+            raise OSError(errno.EINVAL, "Invalid argument")
+        fsync(fd)
+
+    monkeypatch.setattr("os.fsync", fsync_files_only)
+
+    def write(file: IO[bytes]) -> None:
+        file.write(b"new")
+
+    replace_file(path, write, atomic=True)
+
+    assert path.read_bytes() == b"new"
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+@pytest.mark.parametrize("atomic_save", [False, True])
+def test_save_in_place_keeps_hard_links(
+    workspace: tuple[Path, Path], engine: Engine, atomic_save: bool
+) -> None:
+    """Test that a file is overwritten in place unless atomic_save is given."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    link_path = work_dir / "linked.pptx"
+    os.link(pptx_path, link_path)
+    original_content = pptx_path.read_bytes()
+    original_inode = pptx_path.stat().st_ino
+
+    process_pptx_file(
+        pptx_path, preserve_code_fonts=True, engine=engine, atomic_save=atomic_save
+    )
+
+    assert pptx_path.read_bytes() != original_content
+    assert (pptx_path.stat().st_ino == original_inode) is not atomic_save
+    assert link_path.read_bytes() == (
+        original_content if atomic_save else pptx_path.read_bytes()
+    )
+    assert not list(work_dir.glob(".*"))
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import pytest
+
+from benchmark import (
+    DeckSpec,
+    count_elements,
+    find_regressions,
+    generate_deck,
+    main,
+    run_benchmark,
+)
+
+
+def test_generate_deck(tmp_path: Path) -> None:
+    """Test that the synthetic deck has the requested slides and runs."""
+    deck = tmp_path / "deck.pptx"
+    spec = DeckSpec(slides=2, shapes=3, runs=4, table_rows=2, table_cols=2)
+
+    generate_deck(deck, spec)
+
+    assert count_elements(deck) == (2, 2 * (3 * 4 + 2 * 2))
+
+
+def test_run_benchmark() -> None:
+    """Test that every phase is timed and compared against a baseline."""
+    result = run_benchmark(DeckSpec(slides=1, shapes=1, runs=1, charts=1), repeat=1)
+
+    assert set(result["timings"]) == {
+        "open",
+        "update_theme_fonts",
+        "process_presentation",
+        "save",
+        "process_pptx_file[pptx]",
+        "process_pptx_file[xml]",
+    }
+    assert find_regressions(result, result, 0.0) == []
+    slower = {"timings": {name: t / 2 for name, t in result["timings"].items()}}
+    assert len(find_regressions(result, slower, 0.5)) == len(result["timings"])
+
+
+@pytest.mark.parametrize("repeat", ["0", "-1"])
+def test_repeat_must_be_positive(
+    repeat: str,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that --repeat below 1 is rejected before anything is run."""
+    monkeypatch.setattr("sys.argv", ["benchmark.py", "--repeat", repeat])
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 2
+    assert f"must be a positive integer: {repeat}" in capsys.readouterr().err
@@ -10,10 +10,13 @@ from define_theme_fonts import (
     EAST_ASIAN_SCRIPTS,
     FontPolicy,
     load_font_policy,
+    package_theme_partnames,
+    theme_parts,
     update_theme_fonts,
 )
 from logger import Logger
-from replace_fonts import main, process_pptx_file
+from replace_fonts import Engine, main, process_pptx_file
+from xml_package import XmlPackage
 
 POLICY_PATH = Path(__file__).parent / "policy.yaml"
 EXPECTED_POLICY = FontPolicy(
@@ -63,6 +66,33 @@ def test_load_missing_key() -> None:
             load_font_policy(bad)
 
 
+def test_load_code_fonts() -> None:
+    """Test that optional code font rules are loaded from the policy."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        policy_path = Path(tmpdir) / "policy.yaml"
+        policy_path.write_text(
+            POLICY_PATH.read_text()
+            + "code_fonts:\n"
+            + "  preserve: [Source Code Pro]\n"
+            + "  replace:\n"
+            + "    Lucida Console: Consolas\n"
+        )
+        policy = load_font_policy(policy_path)
+    assert policy.preserved_code_fonts == ("Source Code Pro",)
+    assert policy.code_font_replacements == (("Lucida Console", "Consolas"),)
+
+
+def test_load_invalid_code_fonts() -> None:
+    """Test that malformed code font rules raise ValueError."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        policy_path = Path(tmpdir) / "policy.yaml"
+        policy_path.write_text(
+            POLICY_PATH.read_text() + "code_fonts:\n  preserve: Consolas\n"
+        )
+        with pytest.raises(ValueError, match="code_fonts.preserve"):
+            load_font_policy(policy_path)
+
+
 def test_load_file_not_found() -> None:
     """Test that a non-existent policy file raises FileNotFoundError."""
     with pytest.raises(FileNotFoundError):
@@ -137,6 +167,25 @@ def test_update_theme_fonts_no_change(workspace: tuple[Path, Path]) -> None:
     assert "Update theme" not in log_content
 
 
+def test_theme_parts_found_through_relationships(
+    workspace: tuple[Path, Path],
+) -> None:
+    """Test that theme lookup via relationships finds every theme part."""
+    work_dir, _ = workspace
+
+    for pptx_path in sorted(work_dir.glob("sample*.pptx")):
+        prs = Presentation(str(pptx_path))
+        expected = [
+            part.partname.lstrip("/")
+            for part in prs.part.package.iter_parts()
+            if part.content_type.endswith(".theme+xml")
+        ]
+        partnames = [part.partname.lstrip("/") for part in theme_parts(prs)]
+        assert sorted(partnames) == sorted(expected), pptx_path.name
+        with XmlPackage(pptx_path) as package:
+            assert package_theme_partnames(package) == partnames, pptx_path.name
+
+
 def test_code_font_preservation_with_font_policy(workspace: tuple[Path, Path]) -> None:
     """Test that code fonts are preserved when using font policy."""
     work_dir, _ = workspace
@@ -169,6 +218,28 @@ def test_dry_run_does_not_modify_with_font_policy(workspace: tuple[Path, Path])
     assert pptx_path.read_bytes() == original_content
 
 
+def test_xml_engine_updates_theme_fonts(workspace: tuple[Path, Path]) -> None:
+    """Test that the xml engine applies the font policy to theme parts."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / SAMPLE_PPTX
+
+    process_pptx_file(
+        pptx_path,
+        preserve_code_fonts=True,
+        font_policy=EXPECTED_POLICY,
+        engine=Engine.XML,
+    )
+
+    scheme = _get_font_scheme(pptx_path)
+    major = scheme.find(f"{{{A_NS}}}majorFont")
+    minor = scheme.find(f"{{{A_NS}}}minorFont")
+    assert major.find(f"{{{A_NS}}}latin").get("typeface") == EXPECTED_POLICY.major_latin
+    assert minor.find(f"{{{A_NS}}}ea").get("typeface") == EXPECTED_POLICY.minor_ea
+    for script in EAST_ASIAN_SCRIPTS:
+        major_font = major.find(f"{{{A_NS}}}font[@script='{script}']")
+        assert major_font.get("typeface") == EXPECTED_POLICY.major_ea
+
+
 def test_cli_with_font_policy(
     workspace: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
 ) -> None:
@@ -0,0 +1,39 @@
+import ast
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).parent.parent
+
+
+def _local_imports(module: str) -> set[str]:
+    """Return the repository modules `module` imports, directly or not."""
+    found: set[str] = set()
+    pending = [module]
+    while pending:
+        tree = ast.parse((REPO_DIR / f"{pending.pop()}.py").read_text())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                if (REPO_DIR / f"{name}.py").exists() and name not in found:
+                    found.add(name)
+                    pending.append(name)
+    return found
+
+
+@pytest.mark.parametrize("dockerfile", ["Dockerfile", "Dockerfile_dev"])
+def test_dockerfile_copies_runtime_modules(dockerfile: str) -> None:
+    """Test that the image has every module replace_fonts.py imports."""
+    copied = {
+        word.removesuffix(".py")
+        for line in (REPO_DIR / dockerfile).read_text().splitlines()
+        if line.startswith("COPY ")
+        for word in line.split()
+    }
+
+    assert _local_imports("replace_fonts") | {"replace_fonts"} <= copied
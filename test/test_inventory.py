@@ -0,0 +1,67 @@
+import csv
+import json
+import re
+from pathlib import Path
+
+import pytest
+
+from replace_fonts import main
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_scan_cli(
+    workspace: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch, jobs: str
+) -> None:
+    """Test that --scan writes an inventory without touching the files."""
+    work_dir, expected_dir = workspace
+    pptx_paths = sorted(work_dir.glob("sample*.pptx"))
+    contents = [path.read_bytes() for path in pptx_paths]
+    inventory_path = work_dir / "inventory.jsonl"
+
+    args = ["replace_fonts.py", "--code", "--jobs", jobs, "--scan",
+            str(inventory_path), *map(str, pptx_paths)]
+    monkeypatch.setattr("sys.argv", args)
+
+    assert main() == 0
+
+    assert [path.read_bytes() for path in pptx_paths] == contents
+    assert list(work_dir.glob("*.log")) == []
+    assert list(work_dir.glob("*backup*")) == []
+    records = [json.loads(line) for line in inventory_path.read_text().splitlines()]
+    total = records.pop()
+    assert total["file"] is None
+    assert total["files"] == len(pptx_paths) == len(records)
+    for record in records:
+        expected = (expected_dir / Path(record["file"]).with_suffix(".log").name)
+        replaced = len(re.findall(r"\bReplace ", expected.read_text()))
+        assert record["replaced"] == replaced
+        assert record["needs_changes"] == (replaced > 0)
+    assert total["replaced"] == sum(record["replaced"] for record in records)
+    assert total["fonts"]["minor latin"]["Calibri Light"]["mutated"] > 0
+    assert total["theme_fonts"]["minor latin"]
+
+
+def test_scan_cli_csv(
+    workspace: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that --scan writes CSV rows per file, typeface and theme font."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    inventory_path = work_dir / "inventory.csv"
+
+    args = ["replace_fonts.py", "--scan", str(inventory_path), str(pptx_path)]
+    monkeypatch.setattr("sys.argv", args)
+
+    assert main() == 0
+
+    with open(inventory_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    kinds = {(row["file"], row["kind"]) for row in rows}
+    assert kinds == {
+        (str(pptx_path), "file"), (str(pptx_path), "font"),
+        (str(pptx_path), "theme"), ("", "files"), ("", "file"),
+        ("", "font"), ("", "theme"),
+    }
+    file_row = next(row for row in rows if row["kind"] == "file")
+    font_rows = [row for row in rows[1:] if row["kind"] == "font" and row["file"]]
+    assert int(file_row["replaced"]) == sum(int(row["replaced"]) for row in font_rows)
@@ -0,0 +1,107 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import result_cache
+from replace_fonts import main, process_pptx_file
+
+
+def test_jobs_cli(
+    workspace: tuple[Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that --jobs processes files in parallel without interleaving output."""
+    work_dir, _ = workspace
+    pptx_paths = sorted(work_dir.glob("sample*.pptx"))
+    nonexistent_pptx = work_dir / "nonexistent.pptx"
+
+    args = [
+        "replace_fonts.py",
+        "--jobs",
+        "3",
+        *[str(p) for p in pptx_paths],
+        str(nonexistent_pptx),
+    ]
+    monkeypatch.setattr("sys.argv", args)
+
+    exit_code = main()
+
+    assert exit_code == 1
+    output = capsys.readouterr().out
+    assert f"Error: File not found: {nonexistent_pptx}" in output
+    assert (
+        f"{len(pptx_paths)} succeeded, 1 failed out of {len(pptx_paths) + 1}"
+        in output
+    )
+    marker_lines = [
+        line for line in output.splitlines()
+        if line.endswith("was opened.") or line.endswith("was saved.")
+    ]
+    for opened, saved in zip(marker_lines[::2], marker_lines[1::2], strict=True):
+        opened_path = opened.split(" ", 2)[2].removesuffix(" was opened.")
+        assert saved.endswith(f"{opened_path} was saved.")
+    for pptx_path in pptx_paths:
+        assert (work_dir / f"{pptx_path.stem}.log").exists()
+
+
+def test_jobs_cache_hashes_saved_files_in_workers(
+    workspace: tuple[Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that with --jobs, the parent doesn't hash the files workers saved."""
+    work_dir, _ = workspace
+    pptx_paths = [str(p) for p in sorted(work_dir.glob("sample*.pptx"))[:2]]
+    cache_path = work_dir / "cache.json"
+    args = ["replace_fonts.py", "--jobs", "2", "--cache", str(cache_path)]
+    hashed: list[Path] = []
+    file_sha256 = result_cache.file_sha256
+
+    def record_sha256(path: Path) -> str:
+        hashed.append(path)
+        return file_sha256(path)
+
+    # Workers forked from here append to their own copy of the list
+    monkeypatch.setattr("result_cache.file_sha256", record_sha256)
+    monkeypatch.setattr("sys.argv", [*args, *pptx_paths])
+    assert main() == 0
+    assert sorted(map(str, hashed)) == pptx_paths
+
+    hashed.clear()
+    capsys.readouterr()
+    assert main() == 0
+    assert hashed == []
+    assert capsys.readouterr().out.count("is already compliant. (cached)") == 2
+
+
+def _exit_on_crash_file(pptx_path: Path, **kwargs: Any) -> bool:
+    if pptx_path.name == "crash.pptx":
+        os._exit(1)
+    return process_pptx_file(pptx_path, **kwargs)
+
+
+def test_dead_worker_fails_its_files_only(
+    workspace: tuple[Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that a worker dying is reported per file and counted as a failure."""
+    work_dir, _ = workspace
+    crash_path = work_dir / "crash.pptx"
+    shutil.copy(work_dir / "sample1.pptx", crash_path)
+    pptx_paths = [crash_path, *sorted(work_dir.glob("sample*.pptx"))]
+    monkeypatch.setattr("replace_fonts.process_pptx_file", _exit_on_crash_file)
+    monkeypatch.setattr(
+        "sys.argv",
+        ["replace_fonts.py", "--dry-run", "--jobs", "2", *map(str, pptx_paths)],
+    )
+
+    assert main() == 1
+
+    output = capsys.readouterr().out
+    assert f"Error processing {crash_path}: BrokenProcessPool" in output
+    assert f"failed out of {len(pptx_paths)}." in output
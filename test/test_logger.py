@@ -0,0 +1,105 @@
+import io
+import json
+import re
+from pathlib import Path
+
+import pytest
+from test_replace_fonts import normalize_log
+
+from logger import Logger, LogLevel
+from replace_fonts import Engine, main, process_pptx_file
+
+
+def test_log_format(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that messages are timestamped and written to file and console."""
+    log_file = io.StringIO()
+    logger = Logger(log_file)
+
+    logger.log("Replace minor latin from A to +mn-lt", "text")
+
+    expected = r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} \[text\] Replace minor latin"
+    assert re.match(expected, log_file.getvalue())
+    assert capsys.readouterr().out == log_file.getvalue()
+
+
+def test_batched_writes(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that batched messages are written only when the batch fills up."""
+    log_file = io.StringIO()
+    with Logger(log_file, batch_size=3) as logger:
+        logger.log("one")
+        logger.log("two")
+        assert log_file.getvalue() == ""
+        assert capsys.readouterr().out == ""
+        logger.log("three")
+        assert log_file.getvalue().count("\n") == 3
+        logger.log("four")
+    assert log_file.getvalue().count("\n") == 4
+    assert capsys.readouterr().out == log_file.getvalue()
+
+
+def test_separate_levels(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that console and file verbosity are applied independently."""
+    log_file = io.StringIO()
+    logger = Logger(
+        log_file, console_level=LogLevel.SUMMARY, file_level=LogLevel.DETAIL
+    )
+
+    logger.log("sample.pptx was opened.", level=LogLevel.SUMMARY)
+    logger.log("--- Slide 1 ---")
+
+    assert "--- Slide 1 ---" in log_file.getvalue()
+    console = capsys.readouterr().out
+    assert "sample.pptx was opened." in console
+    assert "--- Slide 1 ---" not in console
+
+
+def test_console_level_summary(
+    workspace: tuple[Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that --console-level summary keeps full detail in the log file."""
+    work_dir, expected_dir = workspace
+    pptx_path = work_dir / "sample1.pptx"
+
+    args = ["replace_fonts.py", "--code", "--console-level", "summary", str(pptx_path)]
+    monkeypatch.setattr("sys.argv", args)
+
+    assert main() == 0
+
+    output = capsys.readouterr().out
+    assert f"{pptx_path} was saved." in output
+    assert "Replace" not in output
+    actual = normalize_log((work_dir / "sample1.log").read_text())
+    expected = normalize_log((expected_dir / "sample1.log").read_text())
+    assert actual == expected
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_jsonl_records_match_log(
+    workspace: tuple[Path, Path], engine: Engine
+) -> None:
+    """Test that --jsonl writes one record per replace or preserve action."""
+    work_dir, _ = workspace
+
+    for pptx_path in sorted(work_dir.glob("sample*.pptx")):
+        process_pptx_file(
+            pptx_path, preserve_code_fonts=True, engine=engine, write_jsonl=True
+        )
+
+        log_lines = [
+            line for line in pptx_path.with_suffix(".log").read_text().splitlines()
+            if re.search(r"\] (Replace|Preserve) |^\S+ \S+ (Replace|Preserve) ", line)
+        ]
+        records = [
+            json.loads(line)
+            for line in pptx_path.with_suffix(".jsonl").read_text().splitlines()
+        ]
+        assert len(records) == len(log_lines), pptx_path.name
+        for line, record in zip(log_lines, records, strict=True):
+            assert record["file"] == str(pptx_path)
+            assert record["part"].startswith("ppt/")
+            action = "replace" if " Replace " in line else "preserve"
+            assert record["action"] == action
+            assert f"{record['theme_font']} {record['script']}" in line
+            assert str(record["old"]) in line
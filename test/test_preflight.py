@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import pytest
+
+from apply_theme_fonts import compile_font_rules
+from font_policy import load_font_policy
+from preflight import is_compliant, part_is_compliant
+from replace_fonts import Engine, process_pptx_file
+
+POLICY_PATH = Path(__file__).parent / "policy.yaml"
+SLIDE_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main">'
+    "<p:cSld><p:spTree>"
+    '<p:sp><p:nvSpPr><p:nvPr><p:ph type="title"/></p:nvPr></p:nvSpPr>'
+    '<p:txBody><a:p><a:r><a:rPr><a:latin typeface="{title}"/></a:rPr>'
+    "<a:t>Title</a:t></a:r></a:p></p:txBody></p:sp>"
+    '<p:sp><p:txBody><a:p><a:r><a:rPr><a:ea typeface="{body}"/></a:rPr>'
+    "<a:t>Body</a:t></a:r></a:p></p:txBody></p:sp>"
+    "</p:spTree></p:cSld></p:sld>"
+)
+
+
+@pytest.mark.parametrize(
+    ("title", "body", "code", "expected"),
+    [
+        ("+mj-lt", "+mn-ea", False, True),
+        ("+mn-lt", "+mn-ea", False, False),
+        ("+mj-lt", "+mj-ea", False, False),
+        ("Consolas", "+mn-ea", True, True),
+        ("Consolas", "+mn-ea", False, False),
+    ],
+)
+def test_part_is_compliant(title: str, body: str, code: bool, expected: bool) -> None:
+    """Test that typefaces are checked against the theme font of their shape."""
+    data = SLIDE_TEMPLATE.format(title=title, body=body).encode()
+
+    assert part_is_compliant(data, compile_font_rules(code)) is expected
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_preflight_skips_processed_file(
+    workspace: tuple[Path, Path], engine: Engine
+) -> None:
+    """Test that only files still needing changes are processed."""
+    work_dir, _ = workspace
+    policy = load_font_policy(POLICY_PATH)
+    rules = compile_font_rules(True)
+
+    for pptx_path in sorted(work_dir.glob("sample*.pptx")):
+        assert not is_compliant(pptx_path, rules, policy)
+        assert process_pptx_file(
+            pptx_path, True, font_policy=policy, engine=engine, preflight=True
+        )
+        log_content = pptx_path.with_suffix(".log").read_text()
+        processed_content = pptx_path.read_bytes()
+
+        assert is_compliant(pptx_path, rules, policy)
+        assert not process_pptx_file(
+            pptx_path, True, font_policy=policy, engine=engine, preflight=True
+        )
+        assert pptx_path.read_bytes() == processed_content
+        assert pptx_path.with_suffix(".log").read_text() == log_content
+        assert not pptx_path.with_name(f"{pptx_path.stem} - backup (2).pptx").exists()
+
+
+def test_preflight_checks_theme_fonts(workspace: tuple[Path, Path]) -> None:
+    """Test that a file with compliant text but other theme fonts is processed."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    process_pptx_file(pptx_path, True)
+
+    policy = load_font_policy(POLICY_PATH)
+    assert is_compliant(pptx_path, compile_font_rules(True))
+    assert not is_compliant(pptx_path, compile_font_rules(True), policy)
@@ -1,12 +1,15 @@
+import errno
+import os
 import re
 import tempfile
 import zipfile
 from pathlib import Path
+from typing import Any
 
 import pytest
 from pptx.exc import PackageNotFoundError
 
-from replace_fonts import main, process_pptx_file
+from replace_fonts import Engine, discover_pptx_files, main, process_pptx_file
 
 
 def normalize_log(log_content: str) -> str:
@@ -29,6 +32,7 @@ def normalize_log(log_content: str) -> str:
     return "\n".join(normalized)
 
 
+@pytest.mark.parametrize("engine", list(Engine))
 @pytest.mark.parametrize(("preserve_code_fonts", "log_suffix"), [
     (True, ""),
     (False, "_nocode"),
@@ -37,6 +41,7 @@ def test_log_output_matches_expected(
     workspace: tuple[Path, Path],
     preserve_code_fonts: bool,
     log_suffix: str,
+    engine: Engine,
 ) -> None:
     """Test all sample files and verify log output."""
     work_dir, expected_dir = workspace
@@ -47,7 +52,7 @@ def test_log_output_matches_expected(
         log_path = work_dir / f"{name}.log"
         expected_log_path = expected_dir / f"{name}{log_suffix}.log"
 
-        process_pptx_file(test_pptx_path, preserve_code_fonts)
+        process_pptx_file(test_pptx_path, preserve_code_fonts, engine=engine)
 
         with open(log_path) as actual_log_file:
             actual = normalize_log(actual_log_file.read())
@@ -240,3 +245,119 @@ def test_dry_run_cli(
     assert pptx_path.read_bytes() == original_content
     backups = list(work_dir.glob("*backup*"))
     assert backups == []
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_skip_unchanged(workspace: tuple[Path, Path], engine: Engine) -> None:
+    """Test that an already normalized file is neither backed up nor saved."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+
+    process_pptx_file(
+        pptx_path, preserve_code_fonts=True, engine=engine, skip_unchanged=True
+    )
+    assert (work_dir / "sample1 - backup.pptx").exists()
+    normalized_content = pptx_path.read_bytes()
+
+    process_pptx_file(
+        pptx_path, preserve_code_fonts=True, engine=engine, skip_unchanged=True
+    )
+
+    assert pptx_path.read_bytes() == normalized_content
+    assert not (work_dir / "sample1 - backup (2).pptx").exists()
+    log_content = pptx_path.with_suffix(".log").read_text()
+    assert log_content.count("was saved.") == 1
+    assert "needs no changes. (backup and save skipped)" in log_content
+
+
+def test_discover_pptx_files(tmp_path: Path) -> None:
+    """Test that discovery applies patterns and skips backups."""
+    for name in (
+        "a.pptx",
+        "a - backup.pptx",
+        "a - backup (2).pptx",
+        "notes.txt",
+        "sub/b.pptx",
+        "sub/deep/c.pptx",
+        "archive/d.pptx",
+        "sub/draft-e.pptx",
+    ):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).touch()
+
+    found = discover_pptx_files(tmp_path, ["*.pptx"], ["archive", "draft-*"])
+
+    relative = {path.relative_to(tmp_path).as_posix() for path in found}
+    assert relative == {"a.pptx", "sub/b.pptx", "sub/deep/c.pptx"}
+    found = discover_pptx_files(tmp_path, ["sub/*/*.pptx"], [])
+    assert [path.name for path in found] == ["c.pptx"]
+
+
+def test_unreadable_recursive_dir_fails(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that a --recursive DIR that cannot be read counts as a failure."""
+    missing_dir = tmp_path / "missing"
+    monkeypatch.setattr(
+        "sys.argv", ["replace_fonts.py", "--recursive", str(missing_dir)]
+    )
+
+    assert main() == 1
+    output = capsys.readouterr().out
+    assert f"Error: Cannot read directory {missing_dir}" in output
+    assert "0 succeeded, 1 failed out of 1." in output
+
+
+def test_unreadable_subdirectory_fails(
+    workspace: tuple[Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that a subdirectory that cannot be read counts as a failure."""
+    work_dir, _ = workspace
+    locked_dir = work_dir / "locked"
+    locked_dir.mkdir()
+    scandir = os.scandir
+
+    def deny_locked(path: Path) -> Any:
+        if Path(path) == locked_dir:
+            raise PermissionError(errno.EACCES, "Permission denied", str(path))
+        return scandir(path)
+
+    monkeypatch.setattr("os.scandir", deny_locked)
+    monkeypatch.setattr(
+        "sys.argv",
+        ["replace_fonts.py", "--include", "sample1.pptx", "--recursive", str(work_dir)],
+    )
+
+    assert main() == 1
+    output = capsys.readouterr().out
+    assert f"Error: Cannot read directory {locked_dir}: Permission denied" in output
+    assert "1 succeeded, 1 failed out of 2." in output
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_recursive_cli(
+    workspace: tuple[Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    jobs: str,
+) -> None:
+    """Test that --recursive processes every file found under a directory."""
+    work_dir, _ = workspace
+    pptx_paths = sorted(work_dir.glob("sample*.pptx"))
+
+    args = ["replace_fonts.py", "--code", "--jobs", jobs, "--recursive", str(work_dir)]
+    monkeypatch.setattr("sys.argv", args)
+
+    assert main() == 0
+
+    output = capsys.readouterr().out
+    assert f"All {len(pptx_paths)} file(s) processed successfully." in output
+    for pptx_path in pptx_paths:
+        assert f"{pptx_path} was saved." in output
+    assert "backup.pptx was opened" not in output
+
+
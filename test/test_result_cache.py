@@ -0,0 +1,128 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from replace_fonts import main
+from result_cache import ResultCache, file_digest
+
+OPTIONS = {"code": True, "font_policy": None}
+
+
+def test_mark_and_reload(tmp_path: Path) -> None:
+    """Test that compliant files are remembered across cache instances."""
+    pptx_path = tmp_path / "a.pptx"
+    pptx_path.write_bytes(b"content")
+    cache_path = tmp_path / "cache.json"
+
+    cache = ResultCache(cache_path, OPTIONS)
+    assert not cache.is_compliant(pptx_path)
+    cache.mark_compliant(pptx_path)
+    cache.save()
+
+    assert ResultCache(cache_path, OPTIONS).is_compliant(pptx_path)
+    other_options = {**OPTIONS, "code": False}
+    assert not ResultCache(cache_path, other_options).is_compliant(pptx_path)
+
+
+def test_mark_with_digest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a digest taken elsewhere marks a file without hashing it."""
+    pptx_path = tmp_path / "a.pptx"
+    pptx_path.write_bytes(b"content")
+    digest = file_digest(pptx_path)
+    cache = ResultCache(tmp_path / "cache.json", OPTIONS)
+
+    def fail(path: Path) -> str:
+        raise AssertionError(path)
+
+    monkeypatch.setattr("result_cache.file_sha256", fail)
+    cache.mark_compliant(pptx_path, digest)
+
+    assert cache.is_compliant(pptx_path)
+
+
+def test_content_change_invalidates(tmp_path: Path) -> None:
+    """Test that a modified file is no longer considered compliant."""
+    pptx_path = tmp_path / "a.pptx"
+    pptx_path.write_bytes(b"content")
+    cache = ResultCache(tmp_path / "cache.json", OPTIONS)
+    cache.mark_compliant(pptx_path)
+
+    pptx_path.write_bytes(b"changed content")
+    os.utime(pptx_path, ns=(0, 0))
+
+    assert not cache.is_compliant(pptx_path)
+
+
+def test_same_content_at_another_path(tmp_path: Path) -> None:
+    """Test that entries are keyed by content, not by path."""
+    first = tmp_path / "a.pptx"
+    second = tmp_path / "b.pptx"
+    first.write_bytes(b"content")
+    second.write_bytes(b"content")
+    cache = ResultCache(tmp_path / "cache.json", OPTIONS)
+    cache.mark_compliant(first)
+
+    assert cache.is_compliant(second)
+
+
+def test_lru_eviction(tmp_path: Path) -> None:
+    """Test that the least recently used entry is evicted first."""
+    paths = [tmp_path / f"{i}.pptx" for i in range(3)]
+    for i, path in enumerate(paths):
+        path.write_bytes(f"content {i}".encode())
+    cache = ResultCache(tmp_path / "cache.json", OPTIONS, max_entries=2)
+
+    cache.mark_compliant(paths[0])
+    cache.mark_compliant(paths[1])
+    assert cache.is_compliant(paths[0])
+    cache.mark_compliant(paths[2])
+
+    assert cache.is_compliant(paths[0])
+    assert not cache.is_compliant(paths[1])
+    assert cache.is_compliant(paths[2])
+
+
+def test_corrupt_cache_file(tmp_path: Path) -> None:
+    """Test that an unreadable cache file is treated as empty."""
+    cache_path = tmp_path / "cache.json"
+    cache_path.write_text("not json")
+    pptx_path = tmp_path / "a.pptx"
+    pptx_path.write_bytes(b"content")
+
+    assert not ResultCache(cache_path, OPTIONS).is_compliant(pptx_path)
+
+
+def test_cli_with_cache(
+    workspace: tuple[Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that a second run skips files recorded as compliant."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    cache_path = work_dir / "cache.json"
+
+    args = ["replace_fonts.py", "--cache", str(cache_path), str(pptx_path)]
+    monkeypatch.setattr("sys.argv", args)
+    assert main() == 0
+    saved_content = pptx_path.read_bytes()
+    capsys.readouterr()
+
+    assert main() == 0
+
+    output = capsys.readouterr().out
+    assert f"{pptx_path} is already compliant. (cached)" in output
+    assert "All 1 file(s) processed successfully." in output
+    assert pptx_path.read_bytes() == saved_content
+    assert not (work_dir / "sample1 - backup (2).pptx").exists()
+
+
+def test_unreadable_file_is_not_cached(tmp_path: Path) -> None:
+    """Test that a file that can no longer be read is skipped, not fatal."""
+    pptx_path = tmp_path / "a.pptx"
+    cache = ResultCache(tmp_path / "cache.json", OPTIONS)
+    cache.mark_compliant(pptx_path)
+
+    pptx_path.write_bytes(b"content")
+    assert not cache.is_compliant(pptx_path)
@@ -0,0 +1,193 @@
+import http.client
+import json
+import os
+import threading
+from collections.abc import Generator
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import pytest
+from test_replace_fonts import normalize_log
+
+from server import JOBS_PATH, STATUS_PATH, JobServer, is_loopback_host, main
+
+
+@pytest.fixture
+def server() -> Generator[JobServer]:
+    with JobServer(("127.0.0.1", 0), jobs=1, queue_size=1) as job_server:
+        thread = threading.Thread(target=job_server.serve_forever, daemon=True)
+        thread.start()
+        yield job_server
+        job_server.shutdown()
+        thread.join()
+
+
+def _exit_worker(pptx_path: Path, stats: Any = None) -> bool:
+    os._exit(1)
+
+
+def request(
+    server: JobServer,
+    path: str,
+    body: dict[str, Any] | None = None,
+    content_type: str = "application/json",
+) -> tuple[int, dict[str, Any]]:
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(str(host), port)
+    try:
+        if body is None:
+            connection.request("GET", path)
+        else:
+            connection.request(
+                "POST", path, json.dumps(body), {"Content-Type": content_type}
+            )
+        response = connection.getresponse()
+        return response.status, json.load(response)
+    finally:
+        connection.close()
+
+
+def test_job_matches_cli(workspace: tuple[Path, Path], server: JobServer) -> None:
+    """Test that a job produces the same log as processing the file directly."""
+    work_dir, expected_dir = workspace
+    pptx_path = work_dir / "sample1.pptx"
+
+    status, result = request(server, JOBS_PATH, {"path": str(pptx_path), "code": True})
+
+    assert status == 200
+    assert result["error"] is None
+    assert result["modified"] is True
+    assert f"{pptx_path} was saved." in result["output"]
+    actual = normalize_log((work_dir / "sample1.log").read_text())
+    expected = normalize_log((expected_dir / "sample1.log").read_text())
+    assert actual == expected
+
+
+def test_job_errors(workspace: tuple[Path, Path], server: JobServer) -> None:
+    """Test that bad requests and failed files are reported per job."""
+    work_dir, _ = workspace
+
+    status, result = request(server, JOBS_PATH, {"code": True})
+    assert status == 400
+
+    missing_path = work_dir / "missing.pptx"
+    status, result = request(server, JOBS_PATH, {"path": str(missing_path)})
+    assert status == 200
+    assert result["error"] == f"Error: File not found: {missing_path}"
+
+    status, result = request(server, "/unknown", {"path": str(missing_path)})
+    assert status == 404
+
+    bad_policy = work_dir / "bad.yaml"
+    bad_policy.write_text("theme_fonts: [")
+    for font_policy in (work_dir, bad_policy):
+        status, result = request(
+            server, JOBS_PATH,
+            {"path": str(missing_path), "font_policy": str(font_policy)},
+        )
+        assert status == 400
+
+
+def test_request_without_length_is_rejected(server: JobServer) -> None:
+    """Test that a POST without Content-Length gets 400 instead of hanging."""
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(str(host), port, timeout=10)
+    try:
+        connection.putrequest("POST", JOBS_PATH)
+        connection.putheader("Content-Type", "application/json")
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "Content-Length" in json.load(response)["error"]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize(
+    "content_type", ["text/plain", "application/x-www-form-urlencoded", ""]
+)
+def test_non_json_request_is_rejected(
+    workspace: tuple[Path, Path], server: JobServer, content_type: str
+) -> None:
+    """Test that jobs not sent as JSON get 415 and are not run."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    mtime = pptx_path.stat().st_mtime_ns
+
+    status, result = request(
+        server, JOBS_PATH, {"path": str(pptx_path)}, content_type
+    )
+
+    assert status == 415
+    assert "application/json" in result["error"]
+    assert pptx_path.stat().st_mtime_ns == mtime
+    status, _ = request(
+        server, JOBS_PATH, {"path": str(pptx_path)},
+        "application/json; charset=utf-8",
+    )
+    assert status == 200
+
+
+@pytest.mark.parametrize(
+    ("host", "loopback"),
+    [
+        ("127.0.0.1", True),
+        ("127.1.2.3", True),
+        ("::1", True),
+        ("localhost", True),
+        ("0.0.0.0", False),  # noqa: S104
+        ("192.168.1.10", False),
+        ("::", False),
+        ("example.com", False),
+    ],
+)
+def test_is_loopback_host(host: str, loopback: bool) -> None:
+    """Test which --host values are treated as reachable from this machine only."""
+    assert is_loopback_host(host) is loopback
+
+
+def test_remote_host_needs_flag(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test that listening on a non-loopback address must be asked for."""
+    monkeypatch.setattr("sys.argv", ["server.py", "--host", "0.0.0.0"])  # noqa: S104
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 2
+    assert "--allow-remote" in capsys.readouterr().err
+
+
+def test_broken_pool_is_replaced(
+    workspace: tuple[Path, Path], server: JobServer
+) -> None:
+    """Test that a worker dying fails its job only, and later jobs still run."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+
+    with pytest.raises(BrokenProcessPool):
+        server.run(pptx_path, partial(_exit_worker))
+
+    status, result = request(server, JOBS_PATH, {"path": str(pptx_path)})
+    assert status == 200
+    assert result["error"] is None
+
+
+def test_full_queue_is_rejected(server: JobServer) -> None:
+    """Test that jobs beyond the worker and queue capacity get 503."""
+    for _ in range(server.capacity):
+        server.slots.acquire()
+    try:
+        status, result = request(server, JOBS_PATH, {"path": "sample1.pptx"})
+    finally:
+        for _ in range(server.capacity):
+            server.slots.release()
+
+    assert status == 503
+    assert result == {"error": "Job queue is full"}
+    status, result = request(server, STATUS_PATH)
+    assert status == 200
+    assert result["capacity"] == 2
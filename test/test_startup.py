@@ -0,0 +1,62 @@
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).parent.parent
+IMPORT_TIME_LINE = re.compile(r"^import time:\s*\d+ \|\s*\d+ \|\s*(\S+)$")
+# Imported only to process decks (or, for yaml, to load a font policy)
+DEFERRED_MODULES = ("pptx", "lxml", "yaml", "apply_theme_fonts", "xml_package")
+# Runs the CLI, then reports what ended up in sys.modules
+CLI_PROBE = """
+import json, sys
+import replace_fonts
+sys.argv = sys.argv[1:]
+try:
+    replace_fonts.main()
+except SystemExit:
+    pass
+print("modules:", json.dumps(sorted(sys.modules)), file=sys.__stderr__)
+"""
+
+
+def _loaded_modules(*args: str) -> tuple[set[str], set[str]]:
+    """Run the CLI under `-X importtime`.
+
+    Returns the top-level packages named in the importtime report and those
+    left in `sys.modules` once the CLI is done.
+    """
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", CLI_PROBE, "replace_fonts.py",
+         *args],
+        cwd=REPO_DIR, capture_output=True, text=True, check=False,
+    )
+    imported = set()
+    loaded: set[str] = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("modules: "):
+            loaded = {name.split(".")[0] for name in json.loads(line[9:])}
+        elif (match := IMPORT_TIME_LINE.match(line)) is not None:
+            imported.add(match.group(1).split(".")[0])
+    assert "replace_fonts" in loaded, result.stderr
+    return imported, loaded
+
+
+@pytest.mark.parametrize(
+    ("args", "yaml_loaded"),
+    [
+        (("--help",), False),
+        ((), False),
+        (("--font-policy", "missing.yaml", "sample.pptx"), True),
+    ],
+)
+def test_startup_defers_heavy_imports(args: tuple[str, ...], yaml_loaded: bool) -> None:
+    """Test that the CLI handles options and errors without loading python-pptx."""
+    imported, loaded = _loaded_modules(*args)
+
+    expected = {"yaml"} if yaml_loaded else set()
+    assert imported & set(DEFERRED_MODULES) == expected
+    assert loaded & set(DEFERRED_MODULES) == expected
@@ -0,0 +1,90 @@
+import re
+import shutil
+from pathlib import Path
+
+import pytest
+
+from replace_fonts import Engine, main, process_pptx_file
+from stats import Stats
+
+
+def test_count_within_phase() -> None:
+    """Test that counters are kept per phase and per theme font and script."""
+    stats = Stats()
+
+    with stats.phase("slides"):
+        stats.count("minor", "latin", mutated=True)
+        stats.count("minor", "latin", mutated=False)
+    stats.count("major", "east asian", mutated=True)
+
+    result = stats.as_dict()
+    assert result["phases"]["slides"]["visited"] == 2
+    assert result["phases"]["slides"]["mutated"] == 1
+    assert result["phases"]["slides"]["seconds"] >= 0
+    assert result["fonts"] == {
+        "minor latin": {"visited": 2, "mutated": 1},
+        "major east asian": {"visited": 1, "mutated": 1},
+    }
+
+
+def test_merge() -> None:
+    """Test that merging adds up the counters of another result."""
+    stats = Stats()
+    with stats.phase("slides"):
+        stats.count("minor", "latin", mutated=True, typeface="Calibri")
+    stats.count_theme_font("minor latin", "Arial")
+    total = Stats()
+
+    total.merge(stats.as_dict())
+    total.merge(stats.as_dict())
+
+    assert total.phases["slides"]["visited"] == 2
+    assert total.fonts["minor latin"] == {"visited": 2, "mutated": 2}
+    assert total.typefaces["minor latin"]["Calibri"] == {"visited": 2, "mutated": 2}
+    assert total.theme_fonts == {"minor latin": {"Arial": 2}}
+    assert total.summary()[0] == "Stats:"
+
+
+def test_stats_match_between_engines(workspace: tuple[Path, Path]) -> None:
+    """Test that both engines visit and change the same font elements."""
+    work_dir, _ = workspace
+    results = {}
+
+    for engine in Engine:
+        pptx_path = work_dir / f"sample1_{engine.value}.pptx"
+        shutil.copy(work_dir / "sample1.pptx", pptx_path)
+        stats = Stats()
+        process_pptx_file(
+            pptx_path, preserve_code_fonts=True, engine=engine, stats=stats
+        )
+        results[engine] = stats.as_dict()
+
+    pptx_stats, xml_stats = results[Engine.PPTX], results[Engine.XML]
+    assert pptx_stats["fonts"] == xml_stats["fonts"]
+    assert sum(font["mutated"] for font in pptx_stats["fonts"].values()) > 0
+    for phase in ("backup", "open", "slides", "slide masters", "save"):
+        assert pptx_stats["phases"][phase]["seconds"] >= 0
+        assert (
+            pptx_stats["phases"][phase]["visited"]
+            == xml_stats["phases"][phase]["visited"]
+        )
+
+
+def test_stats_cli(
+    workspace: tuple[Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that --stats prints totals across files processed in parallel."""
+    work_dir, _ = workspace
+    pptx_paths = [str(path) for path in sorted(work_dir.glob("sample*.pptx"))]
+
+    args = ["replace_fonts.py", "--code", "--jobs", "2", "--stats", *pptx_paths]
+    monkeypatch.setattr("sys.argv", args)
+
+    assert main() == 0
+
+    output = capsys.readouterr().out
+    assert "Stats:" in output
+    assert re.search(r"^  slides +\d+\.\d+ s +\d+ visited +\d+ mutated$", output, re.M)
+    assert re.search(r"^  minor latin +\d+ visited +\d+ mutated$", output, re.M)
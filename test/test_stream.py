@@ -0,0 +1,102 @@
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+from pptx import Presentation
+from test_replace_fonts import normalize_log
+
+from replace_fonts import Engine, main, process_pptx_stream
+
+
+class _Pipe(io.BytesIO):
+    def seekable(self) -> bool:
+        return False
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_process_pptx_stream(workspace: tuple[Path, Path], engine: Engine) -> None:
+    """Test that a streamed deck gets the same replacements as a file."""
+    work_dir, expected_dir = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    source = _Pipe(pptx_path.read_bytes())
+    destination = io.BytesIO()
+    log_file = io.StringIO()
+
+    modified = process_pptx_stream(
+        source, destination, True, log_file, engine=engine
+    )
+
+    assert modified is True
+    assert sorted(work_dir.iterdir()) == sorted(
+        work_dir / f"sample{i}.pptx" for i in range(1, 7)
+    )
+    expected = normalize_log((expected_dir / "sample1.log").read_text())
+    actual = normalize_log(log_file.getvalue())
+    assert actual.splitlines()[1:] == expected.splitlines()[2:-1]
+    destination.seek(0)
+    Presentation(destination)
+
+
+def test_stdin_cli(
+    workspace: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that - reads standard input and writes the deck to standard output."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    original_content = pptx_path.read_bytes()
+    stdin = io.TextIOWrapper(io.BytesIO(original_content))
+    stdout = io.TextIOWrapper(io.BytesIO())
+    stderr = io.StringIO()
+    monkeypatch.setattr("sys.stdin", stdin)
+    monkeypatch.setattr("sys.stdout", stdout)
+    monkeypatch.setattr("sys.stderr", stderr)
+    monkeypatch.setattr("sys.argv", ["replace_fonts.py", "--code", "-"])
+
+    assert main() == 0
+
+    assert "standard input was opened." in stderr.getvalue()
+    assert "Replace" in stderr.getvalue()
+    with zipfile.ZipFile(stdout.buffer) as pptx_zip:
+        assert pptx_zip.testzip() is None
+    assert pptx_path.read_bytes() == original_content
+    assert list(work_dir.glob("*backup*")) == []
+
+
+def test_stdin_cli_dry_run_and_errors(
+    workspace: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that - honours --dry-run, rejects unused options and bad input."""
+    work_dir, _ = workspace
+    content = (work_dir / "sample1.pptx").read_bytes()
+    for args, data, code, message in (
+        (["--dry-run", "-"], content, 0, "standard input was opened. (dry run)"),
+        (["--stats", "--jobs", "2", "-"], content, 1, "--jobs, --stats cannot be"),
+        (["-"], b"not a deck", 1, "Error: Invalid PowerPoint file: standard input"),
+    ):
+        stdout = io.TextIOWrapper(io.BytesIO())
+        stderr = io.StringIO()
+        monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(data)))
+        monkeypatch.setattr("sys.stdout", stdout)
+        monkeypatch.setattr("sys.stderr", stderr)
+        monkeypatch.setattr("sys.argv", ["replace_fonts.py", *args])
+
+        assert main() == code
+        assert message in stderr.getvalue()
+        assert stdout.buffer.getvalue() == b""
+
+
+def test_dash_as_option_value_is_not_stdin(
+    workspace: tuple[Path, Path], capsys: pytest.CaptureFixture[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that - given as an option value does not turn on stdin mode."""
+    work_dir, _ = workspace
+    monkeypatch.setattr(
+        "sys.argv",
+        ["replace_fonts.py", "--dry-run", "--include", "-",
+         "--recursive", str(work_dir)],
+    )
+
+    assert main() == 0
+    assert "All 0 file(s) processed successfully." in capsys.readouterr().out
@@ -0,0 +1,153 @@
+import io
+import re
+import shutil
+import zipfile
+from pathlib import Path
+from typing import Any
+
+import pytest
+from pptx import Presentation
+from test_replace_fonts import normalize_log
+
+from apply_theme_fonts import FONT_ELEMENT_PATTERN
+from replace_fonts import Engine, process_pptx_file, process_pptx_stream
+from xml_package import XmlPackage
+
+
+def test_zip_without_content_types_is_closed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that XmlPackage closes the zip when the package can't be read."""
+    pptx_path = tmp_path / "invalid.pptx"
+    with zipfile.ZipFile(pptx_path, "w") as archive:
+        archive.writestr("ppt/presentation.xml", "<p/>")
+    opened: list[zipfile.ZipFile] = []
+
+    class RecordingZipFile(zipfile.ZipFile):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            opened.append(self)
+
+    monkeypatch.setattr(zipfile, "ZipFile", RecordingZipFile)
+    with pytest.raises(KeyError):
+        XmlPackage(pptx_path)
+
+    assert [archive.fp for archive in opened] == [None]
+
+
+def test_xml_engine_output_is_normalized(workspace: tuple[Path, Path]) -> None:
+    """Test that a deck saved by the xml engine needs no further replacement."""
+    work_dir, _ = workspace
+
+    for pptx_path in sorted(work_dir.glob("sample*.pptx")):
+        process_pptx_file(pptx_path, preserve_code_fonts=True, engine=Engine.XML)
+        log_path = pptx_path.with_suffix(".log")
+        log_path.unlink()
+
+        process_pptx_file(pptx_path, preserve_code_fonts=True, dry_run=True)
+
+        assert "Replace" not in log_path.read_text(), pptx_path.name
+
+
+def _zip_entries(pptx_path: Path) -> dict[str, tuple[int, int, int]]:
+    with zipfile.ZipFile(pptx_path) as pptx_zip:
+        assert pptx_zip.testzip() is None
+        return {
+            info.filename: (info.compress_type, info.compress_size, info.CRC)
+            for info in pptx_zip.infolist()
+        }
+
+
+@pytest.mark.parametrize("engine", list(Engine))
+def test_save_copies_untouched_entries_raw(
+    workspace: tuple[Path, Path], engine: Engine
+) -> None:
+    """Test that saving keeps media and untouched parts byte-for-byte."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample5.pptx"
+    before = _zip_entries(pptx_path)
+
+    process_pptx_file(pptx_path, preserve_code_fonts=True, engine=engine)
+
+    after = _zip_entries(pptx_path)
+    assert list(after) == list(before)
+    untouched = [name for name in before if not name.endswith(".xml")]
+    if engine is Engine.XML:
+        untouched += [name for name in before if name.startswith("docProps/")]
+    for name in untouched:
+        assert after[name] == before[name], name
+    assert any(after[name] != before[name] for name in before)
+    Presentation(str(pptx_path))
+
+
+def test_low_memory_output_matches_xml_engine(workspace: tuple[Path, Path]) -> None:
+    """Test that low-memory mode writes the same entries and log as the xml engine."""
+    work_dir, expected_dir = workspace
+
+    for name in ("sample1", "sample5"):
+        pptx_path = work_dir / f"{name}.pptx"
+        low_memory_path = work_dir / f"{name}_low_memory.pptx"
+        shutil.copy(pptx_path, low_memory_path)
+
+        process_pptx_file(pptx_path, preserve_code_fonts=True, engine=Engine.XML)
+        process_pptx_file(
+            low_memory_path,
+            preserve_code_fonts=True,
+            engine=Engine.XML,
+            low_memory=True,
+        )
+
+        assert _zip_entries(low_memory_path) == _zip_entries(pptx_path)
+        actual = normalize_log(low_memory_path.with_suffix(".log").read_text())
+        expected = normalize_log((expected_dir / f"{name}.log").read_text())
+        assert actual.replace("_low_memory", "") == expected
+
+
+def test_low_memory_implies_xml_engine(
+    workspace: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that low_memory is not ignored when the engine is left as pptx."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+    low_memory_packages: list[bool] = []
+
+    class RecordingXmlPackage(XmlPackage):
+        def __init__(self, path: Any, low_memory: bool = False) -> None:
+            super().__init__(path, low_memory)
+            low_memory_packages.append(low_memory)
+
+    monkeypatch.setattr("xml_package.XmlPackage", RecordingXmlPackage)
+    with open(pptx_path, "rb") as source:
+        process_pptx_stream(
+            source, io.BytesIO(), True, io.StringIO(), low_memory=True
+        )
+    process_pptx_file(pptx_path, preserve_code_fonts=True, low_memory=True)
+
+    assert low_memory_packages == [True, True]
+
+
+def test_released_part_keeps_changes(workspace: tuple[Path, Path]) -> None:
+    """Test that a released dirty part is parsed back with its changes."""
+    work_dir, _ = workspace
+    pptx_path = work_dir / "sample1.pptx"
+
+    with XmlPackage(pptx_path, low_memory=True) as package:
+        partname = package.main_partname
+        package.root(partname).set("marker", "1")
+        package.mark_dirty(partname)
+        package.release(partname)
+
+        assert package.modified
+        assert package.root(partname).get("marker") == "1"
+
+
+def test_part_not_matching_is_not_parsed(workspace: tuple[Path, Path]) -> None:
+    """Test that a part is only parsed when its bytes match the pattern."""
+    work_dir, _ = workspace
+    partname = "ppt/charts/chart1.xml"
+
+    with XmlPackage(work_dir / "sample5.pptx") as package:
+        assert package.root_matching(partname, re.compile(b"<no-such-tag")) is None
+        assert partname not in package._roots
+        chart = package.root_matching(partname, FONT_ELEMENT_PATTERN)
+        assert chart is package.root(partname)
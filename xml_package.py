@@ -0,0 +1,404 @@
+import errno
+import os
+import posixpath
+import re
+import shutil
+import struct
+import tempfile
+import zipfile
+import zlib
+from collections.abc import Callable
+from pathlib import Path
+from types import TracebackType
+from typing import IO
+
+from lxml import etree
+from lxml.etree import _Element
+from pptx.opc.constants import RELATIONSHIP_TARGET_MODE as RTM
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+RELATIONSHIPS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES_NAME = "[Content_Types].xml"
+PACKAGE_PARTNAME = ""
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+LOCAL_HEADER_SIZE = 30
+ZIP64_LIMIT = (1 << 31) - 1
+COPY_CHUNK_SIZE = 1 << 20
+# Errors from fsync on a directory the filesystem does not support
+DIRECTORY_FSYNC_UNSUPPORTED = (errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP)
+
+xml_parser = etree.XMLParser(remove_blank_text=True, resolve_entities=False)
+
+
+def rels_name(partname: str) -> str:
+    directory, filename = posixpath.split(partname)
+    return posixpath.join(directory, "_rels", f"{filename}.rels")
+
+
+def serialize_part(root: _Element) -> bytes:
+    blob: bytes = etree.tostring(root, encoding="UTF-8", standalone=True)
+    return blob
+
+
+def deflate(data: bytes) -> bytes:
+    """Compress `data` the way zipfile does for ZIP_DEFLATED entries."""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def inflate(data: bytes) -> bytes:
+    return zlib.decompress(data, -15)
+
+
+def append_entry_raw(
+    out: zipfile.ZipFile,
+    out_info: zipfile.ZipInfo,
+    write_data: Callable[[IO[bytes]], object],
+) -> None:
+    """Add an entry whose compressed bytes are written by `write_data`.
+
+    `out_info` must already carry the CRC and sizes. zipfile has no public
+    API for this, so the local header is written here and the entry is
+    registered the same way `ZipFile.writestr` does.
+    """
+    out_fp = out.fp
+    if out_fp is None:
+        msg = "Attempt to write to a closed ZIP file"
+        raise ValueError(msg)
+    out_info.header_offset = out_fp.tell()
+    zip64 = out_info.file_size > ZIP64_LIMIT or out_info.compress_size > ZIP64_LIMIT
+    out_fp.write(out_info.FileHeader(zip64))
+    write_data(out_fp)
+    out.filelist.append(out_info)
+    out.NameToInfo[out_info.filename] = out_info
+    out.start_dir = out_fp.tell()
+    out._didModify = True  # type: ignore[attr-defined]
+
+
+def copy_entry_raw(
+    source: zipfile.ZipFile, info: zipfile.ZipInfo, out: zipfile.ZipFile
+) -> None:
+    """Copy one entry's compressed bytes from `source` to `out` unchanged."""
+    source_fp = source.fp
+    if source_fp is None:
+        msg = "Attempt to copy an entry from a closed ZIP file"
+        raise ValueError(msg)
+    source_fp.seek(info.header_offset)
+    header = source_fp.read(LOCAL_HEADER_SIZE)
+    if header[:4] != LOCAL_HEADER_SIGNATURE:
+        msg = f"Bad local file header for {info.filename}"
+        raise zipfile.BadZipFile(msg)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    source_fp.seek(name_length + extra_length, os.SEEK_CUR)
+
+    out_info = zipfile.ZipInfo(info.filename, info.date_time)
+    out_info.compress_type = info.compress_type
+    out_info.CRC = info.CRC
+    out_info.compress_size = info.compress_size
+    out_info.file_size = info.file_size
+    out_info.external_attr = info.external_attr
+
+    def copy_data(out_fp: IO[bytes]) -> None:
+        remaining = info.compress_size
+        while remaining > 0:
+            chunk = source_fp.read(min(remaining, COPY_CHUNK_SIZE))
+            if not chunk:
+                msg = f"Truncated data for {info.filename}"
+                raise zipfile.BadZipFile(msg)
+            out_fp.write(chunk)
+            remaining -= len(chunk)
+
+    append_entry_raw(out, out_info, copy_data)
+
+
+def fsync_directory(directory: Path) -> None:
+    """Make a rename in `directory` durable, where the platform allows it.
+
+    Filesystems that cannot fsync a directory are skipped silently: the
+    rename has already happened, so the file must not be reported failed.
+    """
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError as e:
+        if e.errno not in DIRECTORY_FSYNC_UNSUPPORTED:
+            raise
+    finally:
+        os.close(fd)
+
+
+def sibling_temp_file(path: Path) -> tuple[int, str]:
+    """Create a hidden temporary file in the directory of `path`."""
+    return tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp")
+
+
+def move_into_place(tmp_path: Path, path: Path) -> None:
+    """Atomically rename a temporary file, already flushed to disk, over `path`.
+
+    The temporary file takes over the permissions of the file it replaces.
+    """
+    if path.exists():
+        shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+    fsync_directory(path.parent)
+
+
+def copy_into_place(tmp_path: Path, path: Path) -> None:
+    """Overwrite `path` in place with a temporary file's contents and remove it.
+
+    `path` keeps its inode, so its owner, permissions and hard links are
+    kept; a crash while copying can leave it truncated.
+    """
+    with open(tmp_path, "rb") as source, open(path, "wb") as destination:
+        shutil.copyfileobj(source, destination, COPY_CHUNK_SIZE)
+    tmp_path.unlink()
+
+
+def replace_file(
+    path: Path, write: Callable[[IO[bytes]], None], atomic: bool = False
+) -> None:
+    """Write a new file with `write` to a temporary file, then over `path`.
+
+    A failing `write` leaves `path` untouched. By default the result is
+    copied into `path` in place, like writing it directly. With `atomic`,
+    the temporary file is flushed to disk and renamed over `path` instead,
+    so a crash leaves either the old or the new file, never a truncated one.
+    `path` then becomes a new file: hard links to the old file (such as a
+    backup made with `BackupMethod.LINK`) keep the old contents, and the
+    owner becomes the user saving it.
+    """
+    fd, tmp_name = sibling_temp_file(path)
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            write(tmp_file)
+            if atomic:
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+        if atomic:
+            move_into_place(tmp_path, path)
+        else:
+            copy_into_place(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class XmlPackage:
+    """A .pptx package read straight from its zip, without python-pptx parts.
+
+    Partnames are zip member names (no leading slash). XML parts are parsed
+    on first access. On save, only parts marked dirty (or given a new blob)
+    are re-serialized and deflated; every other entry, including all media,
+    is copied as raw compressed bytes.
+
+    With `low_memory`, `release` drops a part's tree as soon as it has been
+    processed, keeping a changed part only as its deflated bytes, so memory
+    no longer grows with the number of slides.
+
+    With `read_only`, `release` drops a part's tree even if it changed. The
+    change still counts towards `modified`, but the package can't be written.
+    """
+
+    def __init__(
+        self,
+        path: Path | IO[bytes],
+        low_memory: bool = False,
+        read_only: bool = False,
+    ) -> None:
+        self._zip = zipfile.ZipFile(path)
+        self._names = set(self._zip.namelist())
+        self._roots: dict[str, _Element] = {}
+        self._rels: dict[str, list[tuple[str, str, str]]] = {}
+        self._dirty: set[str] = set()
+        self._blobs: dict[str, bytes] = {}
+        self._low_memory = low_memory
+        self._read_only = read_only
+        self._deflated: dict[str, tuple[bytes, int, int]] = {}
+        try:
+            self._content_types = self._load_content_types()
+            self.main_partname = self.related_partname(
+                PACKAGE_PARTNAME, RT.OFFICE_DOCUMENT
+            )
+        except BaseException:
+            self._zip.close()
+            raise
+
+    def __enter__(self) -> "XmlPackage":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def _load_content_types(self) -> tuple[dict[str, str], dict[str, str]]:
+        root = etree.fromstring(self._zip.read(CONTENT_TYPES_NAME), xml_parser)
+        defaults = {
+            el.get("Extension", "").lower(): el.get("ContentType", "")
+            for el in root.iter(f"{{{CONTENT_TYPES_NS}}}Default")
+        }
+        overrides = {
+            el.get("PartName", "").lstrip("/"): el.get("ContentType", "")
+            for el in root.iter(f"{{{CONTENT_TYPES_NS}}}Override")
+        }
+        return defaults, overrides
+
+    def content_type(self, partname: str) -> str:
+        defaults, overrides = self._content_types
+        if partname in overrides:
+            return overrides[partname]
+        return defaults.get(posixpath.splitext(partname)[1][1:].lower(), "")
+
+    def rels(self, partname: str) -> list[tuple[str, str, str]]:
+        """Return (rId, reltype, target partname) for internal relationships."""
+        if partname in self._rels:
+            return self._rels[partname]
+        rels: list[tuple[str, str, str]] = []
+        name = rels_name(partname)
+        if name in self._names:
+            root = etree.fromstring(self._zip.read(name), xml_parser)
+            base = posixpath.dirname(partname)
+            for rel in root.iter(f"{{{RELATIONSHIPS_NS}}}Relationship"):
+                if rel.get("TargetMode") == RTM.EXTERNAL:
+                    continue
+                target = rel.get("Target", "")
+                if target.startswith("/"):
+                    target_partname = posixpath.normpath(target).lstrip("/")
+                else:
+                    target_partname = posixpath.normpath(
+                        posixpath.join(base, target)
+                    )
+                if target_partname in self._names:
+                    rels.append(
+                        (rel.get("Id", ""), rel.get("Type", ""), target_partname)
+                    )
+        self._rels[partname] = rels
+        return rels
+
+    def related_partname(self, partname: str, reltype: str) -> str:
+        for _, rel_type, target in self.rels(partname):
+            if rel_type == reltype:
+                return target
+        msg = f"no relationship of type '{reltype}' in {partname or 'package'}"
+        raise KeyError(msg)
+
+    def has_related(self, partname: str, reltype: str) -> bool:
+        return any(rel_type == reltype for _, rel_type, _ in self.rels(partname))
+
+    def target_partname(self, partname: str, r_id: str) -> str:
+        for rel_id, _, target in self.rels(partname):
+            if rel_id == r_id:
+                return target
+        msg = f"no relationship '{r_id}' in {partname}"
+        raise KeyError(msg)
+
+    def root(self, partname: str) -> _Element:
+        if partname not in self._roots:
+            if partname in self._deflated:
+                data = inflate(self._deflated.pop(partname)[0])
+                self._dirty.add(partname)
+            else:
+                data = self._zip.read(partname)
+            self._roots[partname] = etree.fromstring(data, xml_parser)
+        return self._roots[partname]
+
+    def root_matching(
+        self, partname: str, pattern: re.Pattern[bytes]
+    ) -> _Element | None:
+        """Return the root of `partname`, or None if its XML can't match.
+
+        A part that has not been parsed yet is searched for `pattern` as
+        bytes first, so parts that don't match are never parsed.
+        """
+        if partname in self._roots or partname in self._deflated:
+            return self.root(partname)
+        data = self._zip.read(partname)
+        if pattern.search(data) is None:
+            return None
+        self._roots[partname] = etree.fromstring(data, xml_parser)
+        return self._roots[partname]
+
+    def release(self, partname: str) -> None:
+        """Drop the tree of a processed part in low-memory mode.
+
+        A dirty part is serialized and deflated first; if it is needed
+        again, it is parsed back from those bytes.
+        """
+        if not (self._low_memory or self._read_only) or partname not in self._roots:
+            return
+        root = self._roots.pop(partname)
+        if partname in self._dirty and not self._read_only:
+            self._dirty.discard(partname)
+            data = serialize_part(root)
+            self._deflated[partname] = (deflate(data), zlib.crc32(data), len(data))
+
+    def has_part(self, partname: str) -> bool:
+        return partname in self._names
+
+    def read(self, partname: str) -> bytes:
+        return self._zip.read(partname)
+
+    def mark_dirty(self, partname: str) -> None:
+        self._dirty.add(partname)
+
+    @property
+    def modified(self) -> bool:
+        return bool(self._dirty or self._blobs or self._deflated)
+
+    def set_blob(self, partname: str, blob: bytes) -> None:
+        """Replace the bytes of `partname` on save."""
+        self._blobs[partname] = blob
+
+    def save(self, path: Path, atomic: bool = False) -> None:
+        """Write the package to `path` via a temporary file in the same directory.
+
+        The source zip may be the file being replaced, so it is closed before
+        the temporary file is written over `path` (see `replace_file`).
+        """
+
+        def write_and_close(file: IO[bytes]) -> None:
+            self.write(file)
+            self.close()
+
+        replace_file(path, write_and_close, atomic)
+
+    def write(self, file: IO[bytes]) -> None:
+        if self._read_only:
+            msg = "a read-only package can't be written"
+            raise ValueError(msg)
+        with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as out:
+            for info in self._zip.infolist():
+                if info.filename in self._blobs:
+                    data = self._blobs[info.filename]
+                elif info.filename in self._dirty:
+                    data = serialize_part(self._roots[info.filename])
+                elif info.filename in self._deflated:
+                    self._write_deflated(out, info)
+                    continue
+                else:
+                    copy_entry_raw(self._zip, info, out)
+                    continue
+                out_info = zipfile.ZipInfo(info.filename, info.date_time)
+                out_info.compress_type = zipfile.ZIP_DEFLATED
+                out_info.external_attr = info.external_attr
+                out.writestr(out_info, data)
+
+    def _write_deflated(self, out: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+        compressed, crc, size = self._deflated[info.filename]
+        out_info = zipfile.ZipInfo(info.filename, info.date_time)
+        out_info.compress_type = zipfile.ZIP_DEFLATED
+        out_info.CRC = crc
+        out_info.compress_size = len(compressed)
+        out_info.file_size = size
+        out_info.external_attr = info.external_attr
+        append_entry_raw(out, out_info, lambda out_fp: out_fp.write(compressed))